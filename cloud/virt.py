@@ -129,35 +129,143 @@ class LibvirtConnection(object):
             raise Exception("hypervisor connection failure")
 
         self.conn = conn
+        # domains looked up during this run, by name
+        self.domains = {}
 
-    def find_vm(self, vmid):
+    def list_domains(self):
         """
-        Extra bonus feature: vmid = -1 returns a list of everything
+        Return all running and defined domains, with a single call where
+        libvirt supports it
         """
         conn = self.conn
 
-        vms = []
-
-        # this block of code borrowed from virt-manager:
-        # get working domain's name
-        ids = conn.listDomainsID()
-        for id in ids:
-            vm = conn.lookupByID(id)
-            vms.append(vm)
-        # get defined domain
-        names = conn.listDefinedDomains()
-        for name in names:
-            vm = conn.lookupByName(name)
-            vms.append(vm)
+        if hasattr(conn, 'listAllDomains'):
+            vms = conn.listAllDomains(0)
+        else:
+            vms = []
+
+            # this block of code borrowed from virt-manager:
+            # get working domain's name
+            ids = conn.listDomainsID()
+            for id in ids:
+                vm = conn.lookupByID(id)
+                vms.append(vm)
+            # get defined domain
+            names = conn.listDefinedDomains()
+            for name in names:
+                vm = conn.lookupByName(name)
+                vms.append(vm)
 
-        if vmid == -1:
-            return vms
+        for vm in vms:
+            self.domains[vm.name()] = vm
+        return vms
 
+    def get_all_stats(self, groups):
+        """
+        Return a dict mapping each domain name to its domain object and
+        the bulk stats of the given groups, such as 'STATE' for
+        VIR_DOMAIN_STATS_STATE, or None if libvirt does not support bulk
+        stats
+        """
+        if not hasattr(self.conn, 'getAllDomainStats'):
+            return None
+
+        stats = 0
+        for group in groups:
+            flag = getattr(libvirt, 'VIR_DOMAIN_STATS_%s' % group, None)
+            if flag is None:
+                return None
+            stats |= flag
+
+        result = {}
+        for vm, values in self.conn.getAllDomainStats(stats):
+            self.domains[vm.name()] = vm
+            result[vm.name()] = (vm, values)
+        return result
+
+    def get_domain_info(self, vms):
+        """
+        Return a dict mapping the name of each of the given domains to
+        its virDomain.info(), skipping domains that vanished meanwhile
+        """
+        result = {}
         for vm in vms:
-            if vm.name() == vmid:
-                return vm
+            try:
+                result[vm.name()] = vm.info()
+            except libvirt.libvirtError:
+                pass
+        return result
+
+    def get_all_info(self):
+        """
+        Return a dict mapping each domain name to the same list as
+        virDomain.info(): state, maxMem, memory, nrVirtCpu and cpuTime
+        """
+        stats = self.get_all_stats(['STATE', 'CPU_TOTAL', 'BALLOON', 'VCPU'])
+        if stats is None:
+            return self.get_domain_info(self.list_domains())
 
-        raise VMNotFound("virtual machine %s not found" % vmid)
+        result = {}
+        incomplete = []
+        for name, (vm, values) in stats.items():
+            try:
+                result[name] = [values['state.state'],
+                                values['balloon.maximum'],
+                                values['balloon.current'],
+                                values['vcpu.current'],
+                                values.get('cpu.time', 0)]
+            except KeyError:
+                # some drivers leave out stats of inactive domains
+                incomplete.append(vm)
+        result.update(self.get_domain_info(incomplete))
+        return result
+
+    def get_all_states(self):
+        """
+        Return a dict mapping each domain name to its state code
+        """
+        stats = self.get_all_stats(['STATE'])
+        if stats is None:
+            info = self.get_domain_info(self.list_domains())
+            return dict((name, data[0]) for name, data in info.items())
+
+        return dict((name, values['state.state'])
+                    for name, (vm, values) in stats.items())
+
+    def get_autostart_names(self):
+        """
+        Return the set of names of the domains started with the host
+        """
+        flag = getattr(libvirt, 'VIR_CONNECT_LIST_DOMAINS_AUTOSTART', None)
+        if flag is not None and hasattr(self.conn, 'listAllDomains'):
+            return set([vm.name() for vm in self.conn.listAllDomains(flag)])
+
+        names = set()
+        for vm in self.list_domains():
+            try:
+                if vm.autostart():
+                    names.add(vm.name())
+            except libvirt.libvirtError:
+                pass
+        return names
+
+    def find_vm(self, vmid):
+        """
+        Extra bonus feature: vmid = -1 returns a list of everything
+        """
+        if vmid == -1:
+            return self.list_domains()
+
+        vm = self.domains.get(vmid)
+        if vm is None:
+            try:
+                vm = self.conn.lookupByName(vmid)
+            except libvirt.libvirtError, e:
+                if e.get_error_code() == libvirt.VIR_ERR_NO_DOMAIN:
+                    raise VMNotFound("virtual machine %s not found" % vmid)
+                raise
+            self.domains[vmid] = vm
+        return vm
 
     def shutdown(self, vmid):
         return self.find_vm(vmid).shutdown()
@@ -181,7 +289,9 @@ class LibvirtConnection(object):
         return self.find_vm(vmid).destroy()
 
     def undefine(self, vmid):
-        return self.find_vm(vmid).undefine()
+        res = self.find_vm(vmid).undefine()
+        self.domains.pop(vmid, None)
+        return res
 
     def get_status2(self, vm):
         state = vm.info()[0]
@@ -198,30 +308,32 @@ class LibvirtConnection(object):
         return self.conn.getType()
 
     def get_xml(self, vmid):
-        vm = self.conn.lookupByName(vmid)
+        vm = self.find_vm(vmid)
         return vm.XMLDesc(0)
 
     def get_maxVcpus(self, vmid):
-        vm = self.conn.lookupByName(vmid)
+        vm = self.find_vm(vmid)
         return vm.maxVcpus()
 
     def get_maxMemory(self, vmid):
-        vm = self.conn.lookupByName(vmid)
+        vm = self.find_vm(vmid)
         return vm.maxMemory()
 
     def getFreeMemory(self):
         return self.conn.getFreeMemory()
 
     def get_autostart(self, vmid):
-        vm = self.conn.lookupByName(vmid)
+        vm = self.find_vm(vmid)
         return vm.autostart()
 
     def set_autostart(self, vmid, val):
-        vm = self.conn.lookupByName(vmid)
+        vm = self.find_vm(vmid)
         return vm.setAutostart(val)
 
     def define_from_xml(self, xml):
-        return self.conn.defineXML(xml)
+        vm = self.conn.defineXML(xml)
+        self.domains[vm.name()] = vm
+        return vm
 
 
 class Virt(object):
@@ -229,9 +341,12 @@ class Virt(object):
     def __init__(self, uri, module):
         self.module = module
         self.uri = uri
+        self.conn = None
 
     def __get_conn(self):
-        self.conn = LibvirtConnection(self.uri, self.module)
+        # keep one connection, and with it the domain cache, per run
+        if self.conn is None:
+            self.conn = LibvirtConnection(self.uri, self.module)
         return self.conn
 
     def get_vm(self, vmid):
@@ -239,18 +354,19 @@ class Virt(object):
         return self.conn.find_vm(vmid)
 
     def state(self):
-        vms = self.list_vms()
+        states = self.__get_conn().get_all_states()
         state = []
-        for vm in vms:
-            state_blurb = self.conn.get_status(vm)
+        for vm, code in states.items():
+            state_blurb = VIRT_STATE_NAME_MAP.get(code,"unknown")
             state.append("%s %s" % (vm,state_blurb))
         return state
 
     def info(self):
-        vms = self.list_vms()
+        self.__get_conn()
+        all_info = self.conn.get_all_info()
+        autostart = self.conn.get_autostart_names()
         info = dict()
-        for vm in vms:
-            data = self.conn.find_vm(vm).info()
+        for vm, data in all_info.items():
             # libvirt returns maxMem, memory, and cpuTime as long()'s, which
             # xmlrpclib tries to convert to regular int's during serialization.
             # This throws exceptions, so convert them to strings here and
@@ -263,7 +379,7 @@ class Virt(object):
                 "nrVirtCpu" : data[3],
                 "cpuTime"   : str(data[4]),
             }
-            info[vm]["autostart"] = self.conn.get_autostart(vm)
+            info[vm]["autostart"] = int(vm in autostart)
 
         return info
 
@@ -285,19 +401,12 @@ class Virt(object):
 
     def list_vms(self, state=None):
         self.conn = self.__get_conn()
-        vms = self.conn.find_vm(-1)
-        results = []
-        for x in vms:
-            try:
-                if state:
-                    vmstate = self.conn.get_status2(x)
-                    if vmstate == state:
-                        results.append(x.name())
-                else:
-                    results.append(x.name())
-            except:
-                pass
-        return results
+        if state:
+            states = self.conn.get_all_states()
+            return [name for name, code in states.items()
+                    if VIRT_STATE_NAME_MAP.get(code,"unknown") == state]
+
+        return [x.name() for x in self.conn.find_vm(-1)]
 
     def virttype(self):
         return self.__get_conn().get_type()
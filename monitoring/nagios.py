@@ -22,6 +22,7 @@ short_description: Perform common tasks in Nagios related to downtime and notifi
 description:
   - "The M(nagios) module has two basic functions: scheduling downtime and toggling alerts for services or hosts."
   - All actions require the I(host) parameter to be given explicitly. In playbooks you can use the C({{inventory_hostname}}) variable to refer to the host the playbook is currently running on.
+  - You can act on multiple hosts at once by passing a list or separating them with commas, e.g., C(host=web1,web2). Host names containing shell-style wildcards, e.g., C(host=web*), are expanded against the hosts in the Nagios object cache. The commands for all hosts are written to the command file in one batch.
   - You can specify multiple services at once by separating them with commas, .e.g., C(services=httpd,nfs,puppet).
   - When specifying what service to handle there is a special service value, I(host), which will handle alerts/downtime for the I(host itself), e.g., C(service=host). This keyword may not be given with other services at the same time. I(Setting alerts/downtime for a host does not affect alerts/downtime for any of the services running on it.) To schedule downtime for all services on particular host use keyword "all", e.g., C(service=all).
   - When using the M(nagios) module you will need to specify your Nagios server using the C(delegate_to) parameter.
@@ -36,7 +37,9 @@ options:
                "silence_nagios", "unsilence_nagios", "command" ]
   host:
     description:
-      - Host to operate on in Nagios.
+      - Host to operate on in Nagios. Also accepts a list of hosts or host
+        patterns for the C(downtime), C(silence), C(unsilence), C(enable_alerts)
+        and C(disable_alerts) actions.
     required: false
     default: null
   cmdfile:
@@ -72,6 +75,71 @@ options:
         B(Required) option when using the C(command) action.
     required: true
     default: null
+  hostgroup:
+    description:
+      - Hostgroups whose member hosts to operate on, in addition to I(host).
+        The members are read from the Nagios object cache, so unknown
+        hostgroups are reported instead of being sent to Nagios.
+    required: false
+    default: null
+    version_added: "1.9"
+  servicegroup:
+    description:
+      - Servicegroups whose member services to schedule downtime or toggle
+        alerts for, in addition to I(host) and I(services). The members are
+        read from the Nagios object cache.
+    required: false
+    default: null
+    version_added: "1.9"
+  validate_objects:
+    description:
+      - Fail without writing any command if a host, or a service on one of
+        the hosts, is not defined in the Nagios object cache.
+    required: false
+    default: "no"
+    choices: [ "yes", "no" ]
+    version_added: "1.9"
+  config_cache:
+    description:
+      - Path of a file in which to keep the parsed nagios.cfg and object
+        cache. It is reused until either of them changes, so that
+        auto-detection of the command file and host patterns, groups and
+        validation do not parse the Nagios configuration on every run.
+    required: false
+    default: null
+    version_added: "1.9"
+  livestatus:
+    description:
+      - Path of a livestatus Unix socket. When given, the commands are sent
+        with the livestatus C(COMMAND) request over a single connection
+        instead of being written to the command file, and I(verify_timeout)
+        queries livestatus instead of reading the status file.
+    required: false
+    default: null
+    version_added: "1.9"
+  idempotent:
+    description:
+      - Only schedule downtimes that are not active yet. Active downtimes are
+        matched by host, service, author and comment, and are read with one
+        scan of the status file or one livestatus query. A downtime for
+        C(service=all) counts as active only if every service of the host in
+        the object cache has one. If all requested downtimes exist, nothing
+        is written and the task reports no change.
+    required: false
+    default: "no"
+    choices: [ "yes", "no" ]
+    version_added: "1.9"
+  verify_timeout:
+    description:
+      - After writing the commands, wait up to this many seconds for the
+        scheduled downtimes and changed notification flags to show up in the
+        Nagios status file or livestatus, and fail if they do not. The status file is only
+        reread when Nagios has updated it, the notification flags are read
+        from its head and the downtimes from where they started in the
+        previous read. C(0) does not wait.
+    required: false
+    default: 0
+    version_added: "1.9"
 
 author: Tim Bielawa
 requirements: [ "Nagios" ]
@@ -87,6 +155,28 @@ EXAMPLES = '''
 # schedule downtime for ALL services on HOST
 - nagios: action=downtime minutes=45 service=all host={{ inventory_hostname }}
 
+# schedule an hour of HOST downtime for a whole rack in one run
+- nagios: action=downtime minutes=60 service=host host=rack12-*
+
+# silence a list of hosts
+- nagios: action=silence host={{ groups['webservers'] }}
+
+# schedule downtime for every service of a servicegroup, checking
+# names against a cached copy of the nagios configuration
+- nagios: action=downtime servicegroup=payments config_cache=/var/tmp/ansible-nagios.cache
+
+# disable HOST alerts for all hosts of two hostgroups
+- nagios: action=disable_alerts service=host hostgroup=web,db
+
+# schedule downtime and only return once nagios has registered it
+- nagios: action=downtime minutes=60 service=host host={{ inventory_hostname }} verify_timeout=60
+
+# send the commands through livestatus instead of the command file
+- nagios: action=silence host={{ inventory_hostname }} livestatus=/var/lib/nagios/rw/live
+
+# schedule downtime unless this play already did
+- nagios: action=downtime minutes=60 service=host host={{ inventory_hostname }} idempotent=yes
+
 # schedule downtime for a few services
 - nagios: action=downtime services=frob,foobar,qeuz host={{ inventory_hostname }}
 
@@ -118,12 +208,33 @@ EXAMPLES = '''
 import ConfigParser
 import types
 import time
+import os
 import os.path
+import select
+import fnmatch
+import json
+import tempfile
+import socket
+
+# writes of at most this many bytes to a FIFO are atomic; fall back to
+# the POSIX minimum where the platform does not say
+PIPE_BUF = getattr(select, 'PIPE_BUF', 512)
+
+# the sections of the status file, in the order nagios writes them
+STATUS_FLAG_TYPES = ('info', 'programstatus', 'hoststatus', 'servicestatus')
+STATUS_DOWNTIME_TYPES = ('hostdowntime', 'servicedowntime')
+
+# how far before the downtimes found in the previous read of the status
+# file to resume reading it
+STATUS_RESYNC_MARGIN = 65536
+
+# seconds between two checks of the status file while verifying
+VERIFY_POLL_INTERVAL = 1
 
 ######################################################################
 
 
-def which_cmdfile():
+def which_configs():
     locations = [
         # rhel
         '/etc/nagios/nagios.cfg',
@@ -148,14 +259,675 @@ def which_cmdfile():
         '/usr/local/icinga/etc/icinga.cfg',
         ]
 
-    for path in locations:
-        if os.path.exists(path):
-            for line in open(path):
-                if line.startswith('command_file'):
-                    return line.split('=')[1].strip()
+    return [path for path in locations if os.path.exists(path)]
+
+
+class NagiosConfig(object):
+    """
+    The settings of nagios.cfg and an index of the hosts, services,
+    hostgroups and servicegroups in the Nagios object cache.
+
+    Both files are parsed on first use. With a cache_path, the parsed
+    result is also kept in that file and reused as long as neither
+    nagios.cfg nor the object cache has been modified since.
+    """
+
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self.data = None
+        self.services = None
+
+    def _mtime(self, path):
+        try:
+            return os.stat(path).st_mtime
+        except (IOError, OSError, TypeError):
+            return None
+
+    def _is_fresh(self, data):
+        if data.get('version') != self.CACHE_VERSION:
+            return False
+        # a missing nagios.cfg or object cache may appear at any time, so
+        # only found files are trusted
+        if data['nagios_cfg'] is None or data['object_cache_mtime'] is None:
+            return False
+        if self._mtime(data['nagios_cfg']) != data['nagios_cfg_mtime']:
+            return False
+        path = data['settings'].get('object_cache_file')
+        return self._mtime(path) == data['object_cache_mtime']
+
+    def _read_cache(self):
+        if not self.cache_path:
+            return None
+        try:
+            fp = open(self.cache_path)
+            try:
+                data = json.load(fp)
+            finally:
+                fp.close()
+        except (IOError, ValueError):
+            return None
+        if not self._is_fresh(data):
+            return None
+        return data
+
+    def _write_cache(self, data):
+        if not self.cache_path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory)
+            try:
+                os.write(fd, json.dumps(data))
+            finally:
+                os.close(fd)
+            os.rename(tmp_path, self.cache_path)
+        except (IOError, OSError):
+            # the cache only saves time, the parsed data is still valid
+            pass
+
+    def _parse_settings(self, path):
+        settings = {}
+        for line in open(path):
+            if '=' in line and not line.startswith('#'):
+                key, value = line.split('=', 1)
+                settings.setdefault(key.strip(), value.strip())
+        return settings
+
+    def _parse_objects(self, path):
+        hosts = {}
+        hostgroups = {}
+        servicegroups = {}
+        obj_type = None
+        attrs = {}
+        for line in open(path):
+            line = line.strip()
+            if line.startswith('define '):
+                obj_type = line[7:].split('{')[0].strip()
+                attrs = {}
+            elif line == '}':
+                if obj_type == 'host':
+                    hosts.setdefault(attrs.get('host_name'), [])
+                elif obj_type == 'service':
+                    hosts.setdefault(attrs.get('host_name'), []).append(
+                        attrs.get('service_description'))
+                elif obj_type == 'hostgroup':
+                    members = [x.strip() for x in attrs.get('members', '').split(',')]
+                    hostgroups[attrs.get('hostgroup_name')] = [x for x in members if x]
+                elif obj_type == 'servicegroup':
+                    members = [x.strip() for x in attrs.get('members', '').split(',')]
+                    members = [x for x in members if x]
+                    servicegroups[attrs.get('servicegroup_name')] = zip(members[::2], members[1::2])
+                obj_type = None
+            elif obj_type is not None:
+                parts = line.split(None, 1)
+                if len(parts) == 2:
+                    attrs[parts[0]] = parts[1]
+        return hosts, hostgroups, servicegroups
+
+    def _parse(self):
+        data = {
+            'version': self.CACHE_VERSION,
+            'nagios_cfg': None,
+            'nagios_cfg_mtime': None,
+            'settings': {},
+            'object_cache_mtime': None,
+            'hosts': None,
+            'hostgroups': None,
+            'servicegroups': None,
+            }
+        for path in which_configs():
+            settings = self._parse_settings(path)
+            if 'command_file' in settings:
+                data['nagios_cfg'] = path
+                data['nagios_cfg_mtime'] = self._mtime(path)
+                data['settings'] = settings
+                break
+
+        path = data['settings'].get('object_cache_file')
+        data['object_cache_mtime'] = self._mtime(path)
+        if data['object_cache_mtime'] is not None:
+            (data['hosts'], data['hostgroups'],
+             data['servicegroups']) = self._parse_objects(path)
+        return data
+
+    def load(self):
+        if self.data is not None:
+            return
+        self.data = self._read_cache()
+        if self.data is None:
+            self.data = self._parse()
+            if self.data['nagios_cfg'] is not None:
+                self._write_cache(self.data)
+        if self.data['hosts'] is not None:
+            self.services = set()
+            for host, services in self.data['hosts'].items():
+                for service in services:
+                    self.services.add((host, service))
+
+    def setting(self, name):
+        """
+        The value of the given nagios.cfg setting, or None
+        """
+
+        self.load()
+        return self.data['settings'].get(name)
+
+    def has_objects(self):
+        """
+        Whether an object cache was found
+        """
+
+        self.load()
+        return self.data['hosts'] is not None
+
+    def hosts(self):
+        self.load()
+        return self.data['hosts'].keys()
+
+    def has_host(self, host):
+        self.load()
+        return host in self.data['hosts']
+
+    def has_service(self, host, service):
+        self.load()
+        return (host, service) in self.services
+
+    def host_services(self, host):
+        """
+        The services of the given host, or None if the host or the
+        object cache is unknown
+        """
+
+        self.load()
+        if self.data['hosts'] is None:
+            return None
+        return self.data['hosts'].get(host)
+
+    def hostgroup_members(self, hostgroup):
+        """
+        The hosts of the given hostgroup, or None if it does not exist
+        """
+
+        self.load()
+        return self.data['hostgroups'].get(hostgroup)
+
+    def servicegroup_members(self, servicegroup):
+        """
+        The (host, service) pairs of the given servicegroup, or None if
+        it does not exist
+        """
+
+        self.load()
+        members = self.data['servicegroups'].get(servicegroup)
+        if members is None:
+            return None
+        return [tuple(x) for x in members]
+
+
+def which_cmdfile(config=None):
+    if config is None:
+        config = NagiosConfig()
+    return config.setting('command_file')
+
+
+def unique(items):
+    """
+    The given items without duplicates, in their original order
+    """
+
+    seen = set()
+    return [x for x in items if not (x in seen or seen.add(x))]
+
+
+def expand_hosts(module, config, hosts, hostgroups):
+    """
+    Expand the host patterns in the given list against the hosts in
+    the Nagios object cache and add the members of the given
+    hostgroups
+    """
+
+    result = []
+    for host in hosts:
+        if not [c for c in '*?[' if c in host]:
+            result.append(host)
+            continue
+        if not config.has_objects():
+            module.fail_json(msg='unable to locate the nagios object cache to expand host patterns')
+        matched = fnmatch.filter(config.hosts(), host)
+        if not matched:
+            module.fail_json(msg='no hosts match the pattern %s' % host)
+        result.extend(sorted(matched))
+
+    for hostgroup in hostgroups:
+        if not config.has_objects():
+            module.fail_json(msg='unable to locate the nagios object cache to expand hostgroups')
+        members = config.hostgroup_members(hostgroup)
+        if members is None:
+            module.fail_json(msg='unknown hostgroup %s' % hostgroup)
+        result.extend(members)
+
+    return unique(result)
+
+
+def expand_servicegroups(module, config, servicegroups):
+    """
+    The (host, service) pairs of all the given servicegroups
+    """
+
+    result = []
+    for servicegroup in servicegroups:
+        if not config.has_objects():
+            module.fail_json(msg='unable to locate the nagios object cache to expand servicegroups')
+        members = config.servicegroup_members(servicegroup)
+        if members is None:
+            module.fail_json(msg='unknown servicegroup %s' % servicegroup)
+        result.extend(members)
+
+    return unique(result)
+
+
+def validate_objects(module, config, hosts, services):
+    """
+    Fail if any of the given hosts, or any of the given services on
+    those hosts, is not defined in the Nagios object cache
+    """
+
+    if not config.has_objects():
+        module.fail_json(msg='unable to locate the nagios object cache to validate names')
+    unknown = [host for host in hosts if not config.has_host(host)]
+    if unknown:
+        module.fail_json(msg='unknown hosts: %s' % ', '.join(unknown))
+    if services in (None, 'host', 'all'):
+        return
+    unknown = ['%s;%s' % (host, service) for host in hosts for service in services
+               if not config.has_service(host, service)]
+    if unknown:
+        module.fail_json(msg='unknown services: %s' % ', '.join(unknown))
+
+class StatusFile(object):
+    """
+    Incremental reader of the Nagios status file.
+
+    Nagios rewrites the whole file on every status update, so a file
+    that has not been replaced or modified since the previous read is
+    not read again. The notification flags are taken from the status
+    blocks at the head of the file. The downtimes at its end are read
+    starting shortly before the offset at which they started in the
+    previous read, falling back to the start of the file when the
+    earlier sections shrank too much to tell.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.generation = None
+        self.downtime_offset = None
+
+    def _blocks(self, fp):
+        """
+        Yield (type, attributes, offset) for every complete block from
+        the current position of fp on, skipping any partial block
+        """
+
+        obj_type = None
+        attrs = {}
+        start = 0
+        while True:
+            offset = fp.tell()
+            line = fp.readline()
+            if not line:
+                break
+            line = line.strip()
+            if obj_type is None:
+                if line.endswith('{') and '=' not in line:
+                    obj_type = line[:-1].strip()
+                    attrs = {}
+                    start = offset
+            elif line == '}':
+                yield obj_type, attrs, start
+                obj_type = None
+            elif '=' in line:
+                key, value = line.split('=', 1)
+                attrs[key] = value
+
+    def _read_downtimes(self, fp):
+        start = 0
+        if self.downtime_offset is not None:
+            start = max(0, self.downtime_offset - STATUS_RESYNC_MARGIN)
+        fp.seek(start)
+
+        downtimes = []
+        first_offset = None
+        seen = False
+        for obj_type, attrs, offset in self._blocks(fp):
+            if start and not seen and obj_type in STATUS_DOWNTIME_TYPES:
+                # earlier downtimes may lie before the resume point
+                break
+            seen = True
+            if obj_type in STATUS_DOWNTIME_TYPES:
+                if first_offset is None:
+                    first_offset = offset
+                downtimes.append((obj_type, attrs))
+        else:
+            if seen or not start:
+                if first_offset is None:
+                    first_offset = fp.tell()
+                self.downtime_offset = first_offset
+                return downtimes
+
+        self.downtime_offset = None
+        return self._read_downtimes(fp)
+
+    def read(self, flags=True, downtimes=True):
+        """
+        The (type, attributes) of the notification status blocks and/or
+        the downtime blocks, or None if the file has not changed since
+        the previous read
+        """
+
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        generation = (st.st_ino, st.st_size, st.st_mtime)
+        if generation == self.generation:
+            return None
+        self.generation = generation
+
+        blocks = []
+        fp = open(self.path)
+        try:
+            if flags:
+                for obj_type, attrs, offset in self._blocks(fp):
+                    if obj_type not in STATUS_FLAG_TYPES:
+                        break
+                    blocks.append((obj_type, attrs))
+            if downtimes:
+                blocks.extend(self._read_downtimes(fp))
+        finally:
+            fp.close()
+        return blocks
+
+
+def expected_state(line):
+    """
+    The change to the Nagios status the given command line should
+    cause, as a (block type, host, service, value) tuple, or None if
+    its effect is not checked.
 
+    A service of '*' stands for all services of the host. The value is
+    the expected notification flag, or the (author, comment, earliest
+    entry time) of a downtime.
+    """
+
+    try:
+        header, rest = line.split('] ', 1)
+        entry_time = int(header.lstrip('['))
+    except ValueError:
+        return None
+    fields = rest.strip().split(';')
+    cmd = fields[0]
+    if cmd == 'SCHEDULE_HOST_DOWNTIME':
+        return ('hostdowntime', fields[1], None,
+                (fields[7], ';'.join(fields[8:]), entry_time))
+    elif cmd == 'SCHEDULE_HOST_SVC_DOWNTIME':
+        return ('servicedowntime', fields[1], '*',
+                (fields[7], ';'.join(fields[8:]), entry_time))
+    elif cmd == 'SCHEDULE_SVC_DOWNTIME':
+        return ('servicedowntime', fields[1], fields[2],
+                (fields[8], ';'.join(fields[9:]), entry_time))
+    elif cmd in ('ENABLE_NOTIFICATIONS', 'DISABLE_NOTIFICATIONS'):
+        return ('programstatus', None, None,
+                cmd.startswith('ENABLE') and '1' or '0')
+    elif cmd in ('ENABLE_HOST_NOTIFICATIONS', 'DISABLE_HOST_NOTIFICATIONS'):
+        return ('hoststatus', fields[1], None,
+                cmd.startswith('ENABLE') and '1' or '0')
+    elif cmd in ('ENABLE_HOST_SVC_NOTIFICATIONS', 'DISABLE_HOST_SVC_NOTIFICATIONS'):
+        return ('servicestatus', fields[1], '*',
+                cmd.startswith('ENABLE') and '1' or '0')
+    elif cmd in ('ENABLE_SVC_NOTIFICATIONS', 'DISABLE_SVC_NOTIFICATIONS'):
+        return ('servicestatus', fields[1], fields[2],
+                cmd.startswith('ENABLE') and '1' or '0')
     return None
 
+
+def expected_states(commands):
+    """
+    The expected_state of each of the given command lines whose effect
+    is checked
+    """
+
+    states = [expected_state(line) for line in commands]
+    return [x for x in states if x is not None]
+
+
+def downtime_key(state):
+    """
+    The (block type, host, service, author, comment) that identifies
+    the downtime of the given expected state, or None if the state is
+    not a downtime
+    """
+
+    obj_type, host, service, value = state
+    if obj_type not in STATUS_DOWNTIME_TYPES:
+        return None
+    return (obj_type, host, service, value[0], value[1])
+
+
+def index_downtimes(blocks):
+    """
+    The set of downtime_key values of the downtimes in the given status
+    blocks
+    """
+
+    index = set()
+    for obj_type, attrs in blocks:
+        if obj_type not in STATUS_DOWNTIME_TYPES:
+            continue
+        host = attrs.get('host_name')
+        author = attrs.get('author')
+        comment = attrs.get('comment')
+        if obj_type == 'hostdowntime':
+            index.add((obj_type, host, None, author, comment))
+        else:
+            index.add((obj_type, host, attrs.get('service_description'), author, comment))
+    return index
+
+
+def state_reached(state, blocks):
+    """
+    Whether the given expected state shows in the given status blocks
+    """
+
+    obj_type, host, service, value = state
+    matching = [attrs for block_type, attrs in blocks
+                if block_type == obj_type
+                and (host is None or attrs.get('host_name') == host)
+                and (service in (None, '*') or attrs.get('service_description') == service)]
+
+    if obj_type in STATUS_DOWNTIME_TYPES:
+        author, comment, entry_time = value
+        for attrs in matching:
+            try:
+                entered = int(attrs.get('entry_time', 0))
+            except ValueError:
+                continue
+            if attrs.get('author') == author and attrs.get('comment') == comment \
+                    and entered >= entry_time:
+                return True
+        return False
+
+    if obj_type == 'programstatus':
+        return bool(matching) and matching[0].get('enable_notifications') == value
+
+    # a host without services has all of them set already
+    flags = [attrs.get('notifications_enabled') for attrs in matching]
+    return (bool(flags) or service == '*') and not [x for x in flags if x != value]
+
+class CommandFileTransport(object):
+    """
+    Sends external commands by writing them to the Nagios command file
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _chunk_commands(self, commands):
+        """
+        Join the given command lines into chunks of at most PIPE_BUF
+        bytes, never splitting a line. A single line longer than
+        PIPE_BUF makes up a chunk of its own.
+        """
+
+        chunk = []
+        size = 0
+        for cmd in commands:
+            if chunk and size + len(cmd) > PIPE_BUF:
+                yield ''.join(chunk)
+                chunk = []
+                size = 0
+            chunk.append(cmd)
+            size += len(cmd)
+        if chunk:
+            yield ''.join(chunk)
+
+    def send(self, commands):
+        """
+        Write the given command lines with a single open of the command
+        file, one atomic write per chunk so that the lines never
+        interleave with those of other writers to the FIFO
+        """
+
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        try:
+            for chunk in self._chunk_commands(commands):
+                while chunk:
+                    chunk = chunk[os.write(fd, chunk):]
+        finally:
+            os.close(fd)
+
+    def close(self):
+        pass
+
+
+class LivestatusTransport(object):
+    """
+    Sends external commands and queries over one persistent connection
+    to a livestatus Unix socket.
+
+    Commands are pipelined, as livestatus does not answer them. Queries
+    keep the connection open and read the length-prefixed response.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.sock = None
+
+    def _connect(self):
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                self.sock.connect(self.path)
+            except socket.error:
+                self.sock.close()
+                self.sock = None
+                raise
+        return self.sock
+
+    def _recv(self, size):
+        data = []
+        while size > 0:
+            part = self.sock.recv(size)
+            if not part:
+                raise socket.error('livestatus closed the connection')
+            data.append(part)
+            size -= len(part)
+        return ''.join(data)
+
+    def send(self, commands):
+        """
+        Send all the given command lines in one write, each as a
+        request of its own ended by an empty line
+        """
+
+        self._connect().sendall(''.join(['COMMAND %s\n\n' % cmd.rstrip()
+                                         for cmd in commands]))
+
+    def query(self, table, columns, filters=()):
+        """
+        The rows of the given livestatus table as dictionaries of the
+        given columns. Each filter is a (column, values) tuple matching
+        any of the values.
+        """
+
+        lines = ['GET %s' % table, 'Columns: %s' % ' '.join(columns)]
+        for column, values in filters:
+            for value in values:
+                lines.append('Filter: %s = %s' % (column, value))
+            if len(values) > 1:
+                lines.append('Or: %d' % len(values))
+        lines.extend(['OutputFormat: json', 'KeepAlive: on',
+                      'ResponseHeader: fixed16', '', ''])
+        self._connect().sendall('\n'.join(lines))
+
+        header = self._recv(16)
+        body = self._recv(int(header[4:15]))
+        if header[:3] != '200':
+            raise socket.error('livestatus query failed: %s' % body.strip())
+        return [dict(zip(columns, row)) for row in json.loads(body)]
+
+    def downtimes(self, hosts=None):
+        """
+        The active downtimes, optionally only those of the given hosts
+        """
+
+        filters = []
+        if hosts:
+            filters.append(('host_name', hosts))
+        return self.query('downtimes', ['host_name', 'service_description',
+                                        'author', 'comment', 'entry_time',
+                                        'is_service'], filters)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class LivestatusStatus(object):
+    """
+    Reads the notification flags and downtimes from livestatus, in the
+    same form as StatusFile
+    """
+
+    def __init__(self, transport, hosts):
+        self.transport = transport
+        self.hosts = hosts
+
+    def read(self, flags=True, downtimes=True):
+        blocks = []
+        filters = []
+        if self.hosts:
+            filters.append(('host_name', self.hosts))
+        if flags:
+            for row in self.transport.query('status', ['enable_notifications']):
+                blocks.append(('programstatus', {'enable_notifications': str(row['enable_notifications'])}))
+            for row in self.transport.query('hosts', ['name', 'notifications_enabled'],
+                                            [('name', self.hosts)] if self.hosts else []):
+                blocks.append(('hoststatus', {'host_name': row['name'],
+                                              'notifications_enabled': str(row['notifications_enabled'])}))
+            for row in self.transport.query('services', ['host_name', 'description', 'notifications_enabled'],
+                                            filters):
+                blocks.append(('servicestatus', {'host_name': row['host_name'],
+                                                 'service_description': row['description'],
+                                                 'notifications_enabled': str(row['notifications_enabled'])}))
+        if downtimes:
+            for row in self.transport.downtimes(self.hosts):
+                attrs = dict((k, unicode(v)) for k, v in row.items())
+                blocks.append((row['is_service'] and 'servicedowntime' or 'hostdowntime', attrs))
+        return blocks
+
 ######################################################################
 
 
@@ -175,11 +947,18 @@ def main():
         argument_spec=dict(
             action=dict(required=True, default=None, choices=ACTION_CHOICES),
             author=dict(default='Ansible'),
-            host=dict(required=False, default=None),
+            host=dict(required=False, default=None, type='list'),
             minutes=dict(default=30),
-            cmdfile=dict(default=which_cmdfile()),
+            cmdfile=dict(default=None),
             services=dict(default=None, aliases=['service']),
             command=dict(required=False, default=None),
+            hostgroup=dict(required=False, default=None, type='list'),
+            servicegroup=dict(required=False, default=None, type='list'),
+            validate_objects=dict(default='no', type='bool'),
+            config_cache=dict(required=False, default=None),
+            verify_timeout=dict(default=0, type='int'),
+            livestatus=dict(required=False, default=None),
+            idempotent=dict(default='no', type='bool'),
             )
         )
 
@@ -201,13 +980,26 @@ def main():
     # 'minutes' and 'service' manually.
 
     ##################################################################
+    config = NagiosConfig(module.params['config_cache'])
+    hostgroups = module.params['hostgroup'] or []
+    servicegroups = module.params['servicegroup'] or []
+    service_pairs = []
+
+    if servicegroups and action not in ['downtime', 'enable_alerts', 'disable_alerts']:
+        module.fail_json(msg='servicegroup is only usable with the downtime and alerts actions')
+    if hostgroups and action in ['command', 'silence_nagios', 'unsilence_nagios']:
+        module.fail_json(msg='hostgroup is not usable with the %s action' % action)
+
     if action not in ['command', 'silence_nagios', 'unsilence_nagios']:
-        if not host:
+        if not host and not hostgroups and not servicegroups:
             module.fail_json(msg='no host specified for action requiring one')
+        host = expand_hosts(module, config, host or [], hostgroups)
+        module.params['host'] = host
+        service_pairs = expand_servicegroups(module, config, servicegroups)
     ######################################################################
     if action == 'downtime':
         # Make sure there's an actual service selected
-        if not services:
+        if not services and (host or not service_pairs):
             module.fail_json(msg='no service selected to set downtime for')
         # Make sure minutes is a number
         try:
@@ -219,19 +1011,38 @@ def main():
 
     ##################################################################
     if action in ['enable_alerts', 'disable_alerts']:
-        if not services:
+        if not services and (host or not service_pairs):
             module.fail_json(msg='a service is required when setting alerts')
 
     if action in ['command']:
         if not command:
             module.fail_json(msg='no command passed for command action')
+
+    if module.params['validate_objects'] and host:
+        if action in ['downtime', 'enable_alerts', 'disable_alerts'] and services not in ('host', 'all'):
+            validate_objects(module, config, host, services and services.split(','))
+        else:
+            validate_objects(module, config, host, None)
     ##################################################################
-    if not cmdfile:
-        module.fail_json('unable to locate nagios.cfg')
+    livestatus = module.params['livestatus']
+    if not cmdfile and not livestatus:
+        cmdfile = which_cmdfile(config)
+        module.params['cmdfile'] = cmdfile
+    if not cmdfile and not livestatus:
+        module.fail_json(msg='unable to locate nagios.cfg')
+
+    status_file = None
+    if not livestatus and (module.params['verify_timeout'] > 0 or
+                           (module.params['idempotent'] and action == 'downtime')):
+        status_file = config.setting('status_file')
+        if not status_file:
+            module.fail_json(msg='unable to locate the nagios status file')
 
     ##################################################################
-    ansible_nagios = Nagios(module, **module.params)
-    if module.check_mode:
+    ansible_nagios = Nagios(module, service_pairs=service_pairs,
+                            status_file=status_file, config=config,
+                            **module.params)
+    if module.check_mode and not (module.params['idempotent'] and action == 'downtime'):
         module.exit_json(changed=True)
     else:
         ansible_nagios.act()
@@ -258,10 +1069,20 @@ class Nagios(object):
         self.module = module
         self.action = kwargs['action']
         self.author = kwargs['author']
-        self.host = kwargs['host']
+        self.hosts = kwargs['host'] or []
         self.minutes = int(kwargs['minutes'])
         self.cmdfile = kwargs['cmdfile']
         self.command = kwargs['command']
+        self.service_pairs = kwargs.get('service_pairs') or []
+        self.verify_timeout = kwargs.get('verify_timeout') or 0
+        self.status_file = kwargs.get('status_file')
+        self.config = kwargs.get('config')
+        self.idempotent = kwargs.get('idempotent') or False
+
+        if kwargs.get('livestatus'):
+            self.transport = LivestatusTransport(kwargs['livestatus'])
+        else:
+            self.transport = CommandFileTransport(self.cmdfile)
 
         if (kwargs['services'] is None) or (kwargs['services'] == 'host') or (kwargs['services'] == 'all'):
             self.services = kwargs['services']
@@ -269,6 +1090,7 @@ class Nagios(object):
             self.services = kwargs['services'].split(',')
 
         self.command_results = []
+        self.command_buffer = []
 
     def _now(self):
         """
@@ -279,19 +1101,139 @@ class Nagios(object):
 
     def _write_command(self, cmd):
         """
-        Write the given command to the Nagios command file
+        Queue the given command for the Nagios command file. Queued
+        commands are written by _flush_commands.
+        """
+
+        self.command_buffer.append(cmd)
+        return True
+
+    def _flush_commands(self):
+        """
+        Send all queued commands to Nagios in one batch through the
+        transport
         """
 
+        if not self.command_buffer:
+            return
+
+        # names read from the config cache are unicode
+        commands = []
+        for cmd in self.command_buffer:
+            if isinstance(cmd, unicode):
+                cmd = cmd.encode('utf-8')
+            commands.append(cmd)
+
+        # socket.error is an IOError, so tell the transports apart first
         try:
-            fp = open(self.cmdfile, 'w')
-            fp.write(cmd)
-            fp.flush()
-            fp.close()
-            self.command_results.append(cmd.strip())
-        except IOError:
+            self.transport.send(commands)
+        except (IOError, OSError), e:
+            if isinstance(self.transport, LivestatusTransport):
+                self.module.fail_json(msg='unable to send commands to livestatus: %s' % e,
+                                      livestatus=self.transport.path)
             self.module.fail_json(msg='unable to write to nagios command file',
                                   cmdfile=self.cmdfile)
 
+        self.command_results.extend([cmd.strip() for cmd in self.command_buffer])
+        self.command_buffer = []
+
+    def _active_downtimes(self, hosts):
+        """
+        The index of the active downtimes of the given hosts, read with
+        one status file scan or one livestatus query
+        """
+
+        if isinstance(self.transport, LivestatusTransport):
+            try:
+                rows = self.transport.downtimes(hosts)
+            except (IOError, OSError, ValueError), e:
+                self.module.fail_json(msg='unable to query livestatus: %s' % e)
+            blocks = [(row['is_service'] and 'servicedowntime' or 'hostdowntime', row)
+                      for row in rows]
+        else:
+            try:
+                blocks = StatusFile(self.status_file).read(flags=False) or []
+            except (IOError, OSError):
+                self.module.fail_json(msg='unable to read the nagios status file',
+                                      status_file=self.status_file)
+        return index_downtimes(blocks)
+
+    def _downtime_active(self, key, index):
+        """
+        Whether the downtime of the given downtime_key is in the given
+        index. A downtime for all services of a host is active only if
+        each of its services in the object cache has one.
+        """
+
+        obj_type, host, service, author, comment = key
+        if service != '*':
+            return key in index
+        services = self.config is not None and self.config.host_services(host)
+        if not services:
+            return False
+        for service in services:
+            if (obj_type, host, service, author, comment) not in index:
+                return False
+        return True
+
+    def _drop_existing_downtimes(self):
+        """
+        Remove the downtime commands from the queue whose downtime is
+        already active, and return them
+        """
+
+        keys = []
+        for cmd in self.command_buffer:
+            state = expected_state(cmd)
+            keys.append(state is not None and downtime_key(state) or None)
+        hosts = list(set([key[1] for key in keys if key is not None]))
+        if not hosts:
+            return []
+
+        index = self._active_downtimes(hosts)
+        queued = []
+        skipped = []
+        for cmd, key in zip(self.command_buffer, keys):
+            if key is not None and self._downtime_active(key, index):
+                skipped.append(cmd.strip())
+            else:
+                queued.append(cmd)
+        self.command_buffer = queued
+        return skipped
+
+    def _verify_commands(self, commands):
+        """
+        Wait until the effects of the given commands show in the Nagios
+        status file, or fail once verify_timeout seconds have passed
+        """
+
+        pending = expected_states(commands)
+        if isinstance(self.transport, LivestatusTransport):
+            hosts = list(set([x[1] for x in pending if x[1] is not None]))
+            if [x for x in pending if x[1] is None]:
+                hosts = None
+            status = LivestatusStatus(self.transport, hosts)
+        else:
+            status = StatusFile(self.status_file)
+        deadline = time.time() + self.verify_timeout
+        while pending:
+            flags = [x for x in pending if x[0] not in STATUS_DOWNTIME_TYPES]
+            try:
+                blocks = status.read(flags=bool(flags),
+                                     downtimes=len(flags) < len(pending))
+            except socket.error, e:
+                self.module.fail_json(msg='unable to query livestatus: %s' % e,
+                                      nagios_commands=self.command_results)
+            if blocks is not None:
+                pending = [x for x in pending if not state_reached(x, blocks)]
+            if not pending:
+                break
+            if time.time() >= deadline:
+                self.module.fail_json(msg='nagios did not process the commands within %s seconds' % self.verify_timeout,
+                                      nagios_commands=self.command_results,
+                                      pending=[list(x[:3]) for x in pending])
+            time.sleep(VERIFY_POLL_INTERVAL)
+
     def _fmt_dt_str(self, cmd, host, duration, author=None,
                     comment="Scheduling downtime", start=None,
                     svc=None, fixed=1, trigger=0):
@@ -827,36 +1769,48 @@ class Nagios(object):
         """
         # host or service downtime?
         if self.action == 'downtime':
-            if self.services == 'host':
-                self.schedule_host_downtime(self.host, self.minutes)
-            elif self.services == 'all':
-                self.schedule_host_svc_downtime(self.host, self.minutes)
-            else:
-                self.schedule_svc_downtime(self.host,
-                                           services=self.services,
+            for host in self.hosts:
+                if self.services == 'host':
+                    self.schedule_host_downtime(host, self.minutes)
+                elif self.services == 'all':
+                    self.schedule_host_svc_downtime(host, self.minutes)
+                else:
+                    self.schedule_svc_downtime(host,
+                                               services=self.services,
+                                               minutes=self.minutes)
+            for host, service in self.service_pairs:
+                self.schedule_svc_downtime(host, services=[service],
                                            minutes=self.minutes)
 
         # toggle the host AND service alerts
         elif self.action == 'silence':
-            self.silence_host(self.host)
+            for host in self.hosts:
+                self.silence_host(host)
 
         elif self.action == 'unsilence':
-            self.unsilence_host(self.host)
+            for host in self.hosts:
+                self.unsilence_host(host)
 
         # toggle host/svc alerts
         elif self.action == 'enable_alerts':
-            if self.services == 'host':
-                self.enable_host_notifications(self.host)
-            else:
-                self.enable_svc_notifications(self.host,
-                                              services=self.services)
+            for host in self.hosts:
+                if self.services == 'host':
+                    self.enable_host_notifications(host)
+                else:
+                    self.enable_svc_notifications(host,
+                                                  services=self.services)
+            for host, service in self.service_pairs:
+                self.enable_svc_notifications(host, services=[service])
 
         elif self.action == 'disable_alerts':
-            if self.services == 'host':
-                self.disable_host_notifications(self.host)
-            else:
-                self.disable_svc_notifications(self.host,
-                                               services=self.services)
+            for host in self.hosts:
+                if self.services == 'host':
+                    self.disable_host_notifications(host)
+                else:
+                    self.disable_svc_notifications(host,
+                                                   services=self.services)
+            for host, service in self.service_pairs:
+                self.disable_svc_notifications(host, services=[service])
         elif self.action == 'silence_nagios':
             self.silence_nagios()
             
@@ -871,8 +1825,29 @@ class Nagios(object):
             self.module.fail_json(msg="unknown action specified: '%s'" % \
                                       self.action)
 
+        result = {}
+        if self.idempotent:
+            result['skipped_commands'] = self._drop_existing_downtimes()
+        if self.module.check_mode:
+            self.transport.close()
+            self.module.exit_json(nagios_commands=[cmd.strip() for cmd in self.command_buffer],
+                                  changed=bool(self.command_buffer), **result)
+
+        commands = self.command_buffer
+        start = time.time()
+        self._flush_commands()
+        write_latency = time.time() - start
+
+        if self.verify_timeout > 0:
+            start = time.time()
+            self._verify_commands(commands)
+            result['verify_latency'] = time.time() - start
+        self.transport.close()
+
         self.module.exit_json(nagios_commands=self.command_results,
-                              changed=True)
+                              command_count=len(self.command_results),
+                              write_latency=write_latency,
+                              changed=bool(self.command_results), **result)
 
 ######################################################################
 # import module snippets
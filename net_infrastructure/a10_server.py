@@ -91,6 +91,47 @@ options:
     default: present
     aliases: []
     choices: ['present', 'absent']
+  session_cache:
+    description:
+      - Directory in which the aXAPI session of each host and user is cached,
+        so that later tasks reuse it instead of logging in again. A cached
+        session is checked with one cheap call before use and replaced if the
+        device no longer accepts it. Cached sessions are not closed at the end
+        of the task. Concurrent tasks serialize on a lock file per host and user.
+    required: false
+    default: null
+    aliases: []
+    choices: []
+    version_added: "1.9"
+  session_ttl:
+    description:
+      - Number of seconds a cached session is reused after its last use.
+        Should be lower than the idle timeout of the device.
+    required: false
+    default: 300
+    aliases: []
+    choices: []
+    version_added: "1.9"
+  defer_write:
+    description:
+      - If C(yes) together with C(write_config) and C(session_cache), changes
+        only mark the configuration of the host as unsaved in the session
+        cache instead of writing it to non-volatile memory. A later task with
+        C(flush_write) saves it once for the whole batch. Fails without
+        C(session_cache).
+    required: false
+    default: "no"
+    choices: ["yes", "no"]
+    version_added: "1.9"
+  flush_write:
+    description:
+      - If C(yes) together with C(write_config), the running configuration is
+        written to non-volatile memory when this task or an earlier task with
+        C(defer_write) changed it.
+    required: false
+    default: "no"
+    choices: ["yes", "no"]
+    version_added: "1.9"
 '''
 
 EXAMPLES = '''
@@ -107,8 +148,29 @@ EXAMPLES = '''
       - port_num: 8443
         protocol: TCP
 
+# Save the configuration once after updating many servers
+- a10_server:
+    host: a10.mydomain.com
+    username: myadmin
+    password: mypassword
+    server: "{{ item.name }}"
+    server_ip: "{{ item.ip }}"
+    write_config: yes
+    defer_write: yes
+    flush_write: "{{ item == servers|last }}"
+    session_cache: ~/.ansible/a10
+  with_items: servers
+
 '''
 
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+
 VALID_PORT_FIELDS = ['port_num', 'protocol', 'status']
 
 def validate_ports(module, ports):
@@ -144,6 +206,116 @@ def validate_ports(module, ports):
             item['status'] = 1
 
 
+# SessionCache, axapi_open_session, axapi_save_config and write_memory are
+# duplicated in a10_server, a10_service_group and a10_virtual_server; keep
+# the three copies in sync.
+class SessionCache(object):
+    """File-locked cache of the aXAPI session of one host and user.
+
+    Attributes:
+        path: path of the JSON file holding the cached state
+        ttl: number of seconds a session is reused after its last use
+    """
+
+    def __init__(self, cache_dir, host, username, ttl):
+        cache_dir = os.path.expanduser(cache_dir)
+        try:
+            os.makedirs(cache_dir, 0700)
+        except OSError, e:
+            # another task may have created it in the meantime
+            if e.errno != errno.EEXIST:
+                raise
+        key = hashlib.sha1('%s\0%s' % (host, username)).hexdigest()
+        self.path = os.path.join(cache_dir, key)
+        self.ttl = ttl
+        self.lock_file = None
+
+    def lock(self):
+        self.lock_file = open(self.path + '.lock', 'a')
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+
+    def unlock(self):
+        fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+        self.lock_file.close()
+        self.lock_file = None
+
+    def load(self):
+        try:
+            f = open(self.path)
+            try:
+                return json.load(f)
+            finally:
+                f.close()
+        except (IOError, ValueError):
+            return {}
+
+    def store(self, state):
+        # the file holds a session id, so keep it private to the user
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+        try:
+            os.write(fd, json.dumps(state))
+        finally:
+            os.close(fd)
+        os.rename(tmp_path, self.path)
+
+def axapi_open_session(module, base_url, username, password, cache):
+    if cache is None:
+        return axapi_authenticate(module, base_url, username, password)
+    cache.lock()
+    try:
+        state = cache.load()
+        session_url = state.get('session_url')
+        if session_url and state.get('expires', 0) > time.time():
+            result = axapi_call(module, session_url + '&method=system.information.get')
+            if axapi_failure(result):
+                session_url = None
+        elif session_url:
+            # close the expired session rather than leave it to the idle
+            # timeout of the device
+            axapi_call(module, session_url + '&method=session.close')
+            session_url = None
+        if session_url is None:
+            session_url = axapi_authenticate(module, base_url, username, password)
+        state['session_url'] = session_url
+        state['expires'] = time.time() + cache.ttl
+        cache.store(state)
+    finally:
+        cache.unlock()
+    return session_url
+
+def axapi_save_config(module, session_url, cache, changed, write_config, defer_write, flush_write):
+    # returns True if the running configuration was written
+    if not write_config:
+        return False
+    if cache is not None and (defer_write or flush_write):
+        cache.lock()
+        try:
+            state = cache.load()
+            pending = state.get('write_pending', False)
+            if defer_write and not flush_write:
+                if changed and not pending:
+                    state['write_pending'] = True
+                    cache.store(state)
+                return False
+            if not (pending or changed):
+                return False
+            write_memory(module, session_url)
+            state['write_pending'] = False
+            cache.store(state)
+            return True
+        finally:
+            cache.unlock()
+    if changed:
+        write_memory(module, session_url)
+        return True
+    return False
+
+def write_memory(module, session_url):
+    write_result = axapi_call(module, session_url + '&method=system.action.write_memory')
+    if axapi_failure(write_result):
+        module.fail_json(msg="failed to save the configuration: %s" % write_result['response']['err']['msg'])
+
+
 def main():
     argument_spec = a10_argument_spec()
     argument_spec.update(url_argument_spec())
@@ -154,6 +326,10 @@ def main():
             server_ip=dict(type='str', aliases=['ip', 'address']),
             server_status=dict(type='str', default='enabled', aliases=['status'], choices=['enabled', 'disabled']),
             server_ports=dict(type='list', aliases=['port'], default=[]),
+            session_cache=dict(type='str'),
+            session_ttl=dict(type='int', default=300),
+            defer_write=dict(type='bool', default=False),
+            flush_write=dict(type='bool', default=False),
         )
     )
 
@@ -167,6 +343,10 @@ def main():
     password = module.params['password']
     state = module.params['state']
     write_config = module.params['write_config']
+    session_cache = module.params['session_cache']
+    session_ttl = module.params['session_ttl']
+    defer_write = module.params['defer_write']
+    flush_write = module.params['flush_write']
     slb_server = module.params['server_name']
     slb_server_ip = module.params['server_ip']
     slb_server_status = module.params['server_status']
@@ -176,7 +356,16 @@ def main():
         module.fail_json(msg='server_name is required')
 
     axapi_base_url = 'https://%s/services/rest/V2.1/?format=json' % host
-    session_url = axapi_authenticate(module, axapi_base_url, username, password)
+    if defer_write and not session_cache:
+        module.fail_json(msg='defer_write requires session_cache')
+
+    cache = None
+    if session_cache:
+        try:
+            cache = SessionCache(session_cache, host, username, session_ttl)
+        except OSError, e:
+            module.fail_json(msg="unable to create session_cache: %s" % e)
+    session_url = axapi_open_session(module, axapi_base_url, username, password, cache)
 
     # validate the ports data structure
     validate_ports(module, slb_server_ports)
@@ -252,13 +441,12 @@ def main():
             result = dict(msg="the  server was not present")
 
     # if the config has changed, save the config unless otherwise requested
-    if changed and write_config:
-        write_result = axapi_call(module, session_url + '&method=system.action.write_memory')
-        if axapi_failure(write_result):
-            module.fail_json(msg="failed to save the configuration: %s" % write_result['response']['err']['msg'])
+    # or deferred to a later task
+    axapi_save_config(module, session_url, cache, changed, write_config, defer_write, flush_write)
 
-    # log out of the session nicely and exit
-    axapi_call(module, session_url + '&method=session.close')
+    # log out of the session nicely unless it is kept for reuse and exit
+    if cache is None:
+        axapi_call(module, session_url + '&method=session.close')
     module.exit_json(changed=changed, content=result)
 
 # standard ansible module imports
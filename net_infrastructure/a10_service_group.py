@@ -32,6 +32,9 @@ author: Mischa Peters
 notes:
     - Requires A10 Networks aXAPI 2.1
     - When a server doesn't exist and is added to the service-group the server will be created
+    - The servers on the device are fetched once per run and the members are
+      created, updated and removed along with the service-group in a single
+      request; the result includes a per-phase C(timing) breakdown in seconds
 options:
   host:
     description:
@@ -100,7 +103,47 @@ options:
     required: false
     default: 'yes'
     choices: ['yes', 'no']
-
+  session_cache:
+    description:
+      - Directory in which the aXAPI session of each host and user is cached,
+        so that later tasks reuse it instead of logging in again. A cached
+        session is checked with one cheap call before use and replaced if the
+        device no longer accepts it. Cached sessions are not closed at the end
+        of the task. Concurrent tasks serialize on a lock file per host and user.
+    required: false
+    default: null
+    aliases: []
+    choices: []
+    version_added: "1.9"
+  session_ttl:
+    description:
+      - Number of seconds a cached session is reused after its last use.
+        Should be lower than the idle timeout of the device.
+    required: false
+    default: 300
+    aliases: []
+    choices: []
+    version_added: "1.9"
+  defer_write:
+    description:
+      - If C(yes) together with C(write_config) and C(session_cache), changes
+        only mark the configuration of the host as unsaved in the session
+        cache instead of writing it to non-volatile memory. A later task with
+        C(flush_write) saves it once for the whole batch. Fails without
+        C(session_cache).
+    required: false
+    default: "no"
+    choices: ["yes", "no"]
+    version_added: "1.9"
+  flush_write:
+    description:
+      - If C(yes) together with C(write_config), the running configuration is
+        written to non-volatile memory when this task or an earlier task with
+        C(defer_write) changed it.
+    required: false
+    default: "no"
+    choices: ["yes", "no"]
+    version_added: "1.9"
 '''
 
 EXAMPLES = '''
@@ -121,8 +164,29 @@ EXAMPLES = '''
         port: 8080
         status: disabled
 
+# Save the configuration once after updating many service-groups
+- a10_service_group:
+    host: a10.mydomain.com
+    username: myadmin
+    password: mypassword
+    service_group: "{{ item.name }}"
+    servers: "{{ item.servers }}"
+    write_config: yes
+    defer_write: yes
+    flush_write: "{{ item == service_groups|last }}"
+    session_cache: ~/.ansible/a10
+  with_items: service_groups
+
 '''
 
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+
 VALID_SERVICE_GROUP_FIELDS = ['name', 'protocol', 'lb_method']
 VALID_SERVER_FIELDS = ['server', 'port', 'status']
 
@@ -151,6 +215,172 @@ def validate_servers(module, servers):
         else:
             item['status'] = 1
 
+def get_server_names(module, session_url):
+    # the members may reference a server by its name or its address
+    result = axapi_call(module, session_url + '&method=slb.server.getAll')
+    if axapi_failure(result):
+        module.fail_json(msg="failed to fetch the servers: %s" % result['response']['err']['msg'])
+    names = set()
+    for server in result.get('server_list', []):
+        names.add(server.get('name'))
+        names.add(server.get('host'))
+    return names
+
+def index_members(servers):
+    # later definitions of the same member replace earlier ones
+    return dict(((x['server'], x['port']), x) for x in servers)
+
+def diff_members(requested, defined):
+    """Return the members to create, update and delete.
+
+    Both arguments are dictionaries keyed by (server, port), as returned
+    by index_members().
+    """
+    create = []
+    update = []
+    for key, server in requested.items():
+        def_server = defined.get(key)
+        if def_server is None:
+            create.append(server)
+        else:
+            for valid_field in VALID_SERVER_FIELDS:
+                if server[valid_field] != def_server.get(valid_field):
+                    update.append(server)
+                    break
+    delete = [server for key, server in defined.items() if key not in requested]
+    return (create, update, delete)
+
+def update_service_group(module, session_url, json_post, member_list, create, update, delete):
+    # the member list given to the update replaces the current members in
+    # one call; fall back to one call per changed member if it is rejected
+    post = {'service_group': dict(json_post['service_group'], member_list=member_list)}
+    result = axapi_call(module, session_url + '&method=slb.service_group.update', json.dumps(post))
+    if not axapi_failure(result):
+        return
+    result = axapi_call(module, session_url + '&method=slb.service_group.update', json.dumps(json_post))
+    if axapi_failure(result):
+        module.fail_json(msg=result['response']['err']['msg'])
+    name = json_post['service_group']['name']
+    for method, servers in (('delete', delete), ('create', create), ('update', update)):
+        for server in servers:
+            server_data = {
+                "name": name,
+                "member": server,
+            }
+            result = axapi_call(module, session_url + '&method=slb.service_group.member.' + method, json.dumps(server_data))
+            if axapi_failure(result):
+                module.fail_json(msg="failed to %s the member %s:%s: %s" % (method, server['server'], server['port'], result['response']['err']['msg']))
+
+
+# SessionCache, axapi_open_session, axapi_save_config and write_memory are
+# duplicated in a10_server, a10_service_group and a10_virtual_server; keep
+# the three copies in sync.
+class SessionCache(object):
+    """File-locked cache of the aXAPI session of one host and user.
+
+    Attributes:
+        path: path of the JSON file holding the cached state
+        ttl: number of seconds a session is reused after its last use
+    """
+
+    def __init__(self, cache_dir, host, username, ttl):
+        cache_dir = os.path.expanduser(cache_dir)
+        try:
+            os.makedirs(cache_dir, 0700)
+        except OSError, e:
+            # another task may have created it in the meantime
+            if e.errno != errno.EEXIST:
+                raise
+        key = hashlib.sha1('%s\0%s' % (host, username)).hexdigest()
+        self.path = os.path.join(cache_dir, key)
+        self.ttl = ttl
+        self.lock_file = None
+
+    def lock(self):
+        self.lock_file = open(self.path + '.lock', 'a')
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+
+    def unlock(self):
+        fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+        self.lock_file.close()
+        self.lock_file = None
+
+    def load(self):
+        try:
+            f = open(self.path)
+            try:
+                return json.load(f)
+            finally:
+                f.close()
+        except (IOError, ValueError):
+            return {}
+
+    def store(self, state):
+        # the file holds a session id, so keep it private to the user
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+        try:
+            os.write(fd, json.dumps(state))
+        finally:
+            os.close(fd)
+        os.rename(tmp_path, self.path)
+
+def axapi_open_session(module, base_url, username, password, cache):
+    if cache is None:
+        return axapi_authenticate(module, base_url, username, password)
+    cache.lock()
+    try:
+        state = cache.load()
+        session_url = state.get('session_url')
+        if session_url and state.get('expires', 0) > time.time():
+            result = axapi_call(module, session_url + '&method=system.information.get')
+            if axapi_failure(result):
+                session_url = None
+        elif session_url:
+            # close the expired session rather than leave it to the idle
+            # timeout of the device
+            axapi_call(module, session_url + '&method=session.close')
+            session_url = None
+        if session_url is None:
+            session_url = axapi_authenticate(module, base_url, username, password)
+        state['session_url'] = session_url
+        state['expires'] = time.time() + cache.ttl
+        cache.store(state)
+    finally:
+        cache.unlock()
+    return session_url
+
+def axapi_save_config(module, session_url, cache, changed, write_config, defer_write, flush_write):
+    # returns True if the running configuration was written
+    if not write_config:
+        return False
+    if cache is not None and (defer_write or flush_write):
+        cache.lock()
+        try:
+            state = cache.load()
+            pending = state.get('write_pending', False)
+            if defer_write and not flush_write:
+                if changed and not pending:
+                    state['write_pending'] = True
+                    cache.store(state)
+                return False
+            if not (pending or changed):
+                return False
+            write_memory(module, session_url)
+            state['write_pending'] = False
+            cache.store(state)
+            return True
+        finally:
+            cache.unlock()
+    if changed:
+        write_memory(module, session_url)
+        return True
+    return False
+
+def write_memory(module, session_url):
+    write_result = axapi_call(module, session_url + '&method=system.action.write_memory')
+    if axapi_failure(write_result):
+        module.fail_json(msg="failed to save the configuration: %s" % write_result['response']['err']['msg'])
+
 
 def main():
     argument_spec = a10_argument_spec()
@@ -174,6 +404,10 @@ def main():
                                                'src-ip-only-hash',
                                                'src-ip-hash']),
             servers=dict(type='list', aliases=['server', 'member'], default=[]),
+            session_cache=dict(type='str'),
+            session_ttl=dict(type='int', default=300),
+            defer_write=dict(type='bool', default=False),
+            flush_write=dict(type='bool', default=False),
         )
     )
 
@@ -187,6 +421,10 @@ def main():
     password = module.params['password']
     state = module.params['state']
     write_config = module.params['write_config']
+    session_cache = module.params['session_cache']
+    session_ttl = module.params['session_ttl']
+    defer_write = module.params['defer_write']
+    flush_write = module.params['flush_write']
     slb_service_group = module.params['service_group']
     slb_service_group_proto = module.params['service_group_protocol']
     slb_service_group_method = module.params['service_group_method']
@@ -224,91 +462,70 @@ def main():
         }
     }
 
+    timing = {}
+    started = time.time()
+
     # first we authenticate to get a session id
-    session_url = axapi_authenticate(module, axapi_base_url, username, password)
+    if defer_write and not session_cache:
+        module.fail_json(msg='defer_write requires session_cache')
+
+    cache = None
+    if session_cache:
+        try:
+            cache = SessionCache(session_cache, host, username, session_ttl)
+        except OSError, e:
+            module.fail_json(msg="unable to create session_cache: %s" % e)
+    session_url = axapi_open_session(module, axapi_base_url, username, password, cache)
+    timing['authenticate'] = time.time() - started
 
     # then we check to see if the specified group exists
+    phase = time.time()
     slb_result = axapi_call(module, session_url + '&method=slb.service_group.search', json.dumps({'name': slb_service_group}))
     slb_service_group_exist = not axapi_failure(slb_result)
 
     changed = False
     if state == 'present':
         # before creating/updating we need to validate that servers
-        # defined in the servers list exist to prevent errors
-        checked_servers = []
+        # defined in the servers list exist to prevent errors, using
+        # a single fetch of all servers on the device
+        known_servers = get_server_names(module, session_url)
+        timing['fetch'] = time.time() - phase
+        phase = time.time()
         for server in slb_servers:
-            result = axapi_call(module, session_url + '&method=slb.server.search', json.dumps({'name': server['server']}))
-            if axapi_failure(result):
+            if server['server'] not in known_servers:
                 module.fail_json(msg="the server %s specified in the servers list does not exist" % server['server'])
-            checked_servers.append(server['server'])
+
+        # next we pull the defined list of servers out of the returned
+        # results and index both lists by (server, port)
+        defined_servers = slb_result.get('service_group', {}).get('member_list', [])
+        members = index_members(slb_servers)
+        create, update, delete = diff_members(members, index_members(defined_servers))
+        member_list = members.values()
+        member_list.sort(key=lambda x: (x['server'], x['port']))
+        timing['diff'] = time.time() - phase
+        phase = time.time()
 
         if not slb_service_group_exist:
+            # the members are created along with the service group
+            json_post['service_group']['member_list'] = member_list
             result = axapi_call(module, session_url + '&method=slb.service_group.create', json.dumps(json_post))
             if axapi_failure(result):
                 module.fail_json(msg=result['response']['err']['msg'])
             changed = True
         else:
             # check to see if the service group definition without the
-            # server members is different, and update that individually
-            # if it needs it
+            # server members is different, and update that along with
+            # the members if either needs it
             do_update = False
             for field in VALID_SERVICE_GROUP_FIELDS:
                 if json_post['service_group'][field] != slb_result['service_group'][field]:
                     do_update = True
                     break
 
-            if do_update:
-                result = axapi_call(module, session_url + '&method=slb.service_group.update', json.dumps(json_post))
-                if axapi_failure(result):
-                    module.fail_json(msg=result['response']['err']['msg'])
-                changed = True
-
-        # next we pull the defined list of servers out of the returned
-        # results to make it a bit easier to iterate over
-        defined_servers = slb_result.get('service_group', {}).get('member_list', [])
-
-        # next we add/update new member servers from the user-specified
-        # list if they're different or not on the target device
-        for server in slb_servers:
-            found = False
-            different = False
-            for def_server in defined_servers:
-                if server['server'] == def_server['server']:
-                    found = True
-                    for valid_field in VALID_SERVER_FIELDS:
-                        if server[valid_field] != def_server[valid_field]:
-                            different = True
-                            break
-                    if found or different:
-                        break
-            # add or update as required
-            server_data = {
-                "name": slb_service_group,
-                "member": server,
-            }
-            if not found:
-                result = axapi_call(module, session_url + '&method=slb.service_group.member.create', json.dumps(server_data))
-                changed = True
-            elif different:
-                result = axapi_call(module, session_url + '&method=slb.service_group.member.update', json.dumps(server_data))
-                changed = True
-
-        # finally, remove any servers that are on the target
-        # device but were not specified in the list given
-        for server in defined_servers:
-            found = False
-            for slb_server in slb_servers:
-                if server['server'] == slb_server['server']:
-                    found = True
-                    break
-            # remove if not found
-            server_data = {
-                "name": slb_service_group,
-                "member": server,
-            }
-            if not found:
-                result = axapi_call(module, session_url + '&method=slb.service_group.member.delete', json.dumps(server_data))
+            if do_update or create or update or delete:
+                update_service_group(module, session_url, json_post, member_list, create, update, delete)
                 changed = True
+        timing['apply'] = time.time() - phase
 
         # if we changed things, get the full info regarding
         # the service group for the return data below
@@ -324,14 +541,16 @@ def main():
             result = dict(msg="the service group was not present")
 
     # if the config has changed, save the config unless otherwise requested
-    if changed and write_config:
-        write_result = axapi_call(module, session_url + '&method=system.action.write_memory')
-        if axapi_failure(write_result):
-            module.fail_json(msg="failed to save the configuration: %s" % write_result['response']['err']['msg'])
-
-    # log out of the session nicely and exit
-    axapi_call(module, session_url + '&method=session.close')
-    module.exit_json(changed=changed, content=result)
+    # or deferred to a later task
+    phase = time.time()
+    if axapi_save_config(module, session_url, cache, changed, write_config, defer_write, flush_write):
+        timing['write_memory'] = time.time() - phase
+
+    # log out of the session nicely unless it is kept for reuse and exit
+    if cache is None:
+        axapi_call(module, session_url + '&method=session.close')
+    timing['total'] = time.time() - started
+    module.exit_json(changed=changed, content=result, timing=timing)
 
 # standard ansible module imports
 from ansible.module_utils.basic import *
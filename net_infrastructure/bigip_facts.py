@@ -82,6 +82,121 @@ options:
         default: null
         choices: []
         aliases: []
+    workers:
+        description:
+            - Number of concurrent iControl sessions used to fetch the
+              attributes of a fact category. Each per-attribute call runs
+              on one of up to this many sessions and the results are merged
+              into the same facts. A value of 1 issues the calls one after
+              another on the primary connection.
+        required: false
+        default: 1
+        choices: []
+        aliases: []
+        version_added: "1.9"
+    fields:
+        description:
+            - Dictionary mapping a fact category to the list of attributes to
+              collect for it, e.g. C({virtual_server: [destination,
+              default_pool_name]}). Only the iControl calls for the listed
+              attributes are made. Categories not present collect all of
+              their attributes. Not applicable for certificate, key and
+              software fact categories.
+        required: false
+        default: null
+        choices: []
+        aliases: []
+        version_added: "1.9"
+    chunk_size:
+        description:
+            - Number of objects whose attributes are requested per iControl
+              call. Large object tables are then fetched one window of names
+              at a time, which bounds the size of each SOAP request and the
+              memory held by in-flight responses. A value of 0 requests all
+              objects of a category at once.
+        required: false
+        default: 0
+        choices: []
+        aliases: []
+        version_added: "1.9"
+    category_workers:
+        description:
+            - Number of fact categories collected concurrently. Each worker
+              opens its own iControl session, so the total run time is close
+              to that of the slowest category instead of the sum of all of
+              them. Combined with I(workers), up to
+              I(category_workers) * I(workers) sessions may be open at once.
+        required: false
+        default: 1
+        choices: []
+        aliases: []
+        version_added: "1.9"
+    profile:
+        description:
+            - Record the wall time, call count and approximate response size
+              of every per-attribute iControl call, plus the total time of each
+              fact category, and return them as C(bigip_facts_profile).
+        required: false
+        default: false
+        choices: []
+        aliases: []
+        version_added: "1.9"
+    snapshot:
+        description:
+            - Path of a snapshot file holding a fingerprint of every object
+              returned by the previous run. When set, only added and changed
+              objects are returned in the facts, removed and changed object
+              names are summarized in C(bigip_facts_diff), and the file is
+              updated with the current fingerprints. Not applicable for
+              software and system_info fact categories.
+        required: false
+        default: null
+        choices: []
+        aliases: []
+        version_added: "1.9"
+    fingerprints:
+        description:
+            - Previous fingerprints, as returned in C(bigip_facts_fingerprints),
+              to diff against instead of a I(snapshot) file.
+        required: false
+        default: null
+        choices: []
+        aliases: []
+        version_added: "1.9"
+    skip_unchanged:
+        description:
+            - In diff mode, read the object status of categories that have
+              one (node, pool, virtual_address and virtual_server) first and
+              only fetch the attributes of objects that are new or whose
+              status changed. Configuration changes that leave the status
+              untouched are not reported for those categories.
+        required: false
+        default: false
+        choices: []
+        aliases: []
+        version_added: "1.9"
+    cache_dir:
+        description:
+            - Directory of a local fact cache. When set, the facts of each
+              category are stored there, keyed by server, user, category,
+              filter and fields, and reused while they are fresh.
+        required: false
+        default: null
+        choices: []
+        aliases: []
+        version_added: "1.9"
+    cache_ttl:
+        description:
+            - Dictionary mapping a fact category to the number of seconds its
+              cached facts are used without contacting the BIG-IP. The
+              C(default) key sets the time to live of categories not listed.
+              Once expired, cached facts are still reused when the device's
+              configuration change time has not moved since they were stored.
+        required: false
+        default: "{default: 300}"
+        choices: []
+        aliases: []
+        version_added: "1.9"
 '''
 
 EXAMPLES = '''
@@ -101,6 +216,69 @@ EXAMPLES = '''
       password=mysecret
       include=interface,vlan
 
+  - name: Collect BIG-IP virtual server and pool facts over 8 sessions
+    local_action: >
+      bigip_facts
+      server=lb.mydomain.com
+      user=admin
+      password=mysecret
+      include=virtual_server,pool
+      workers=8
+
+  - name: Collect several categories at once over separate sessions
+    local_action: >
+      bigip_facts
+      server=lb.mydomain.com
+      user=admin
+      password=mysecret
+      include=interface,self_ip,vlan,virtual_server,pool,node
+      category_workers=4
+
+  - name: Find out which virtual server attributes are slow to collect
+    local_action: >
+      bigip_facts
+      server=lb.mydomain.com
+      user=admin
+      password=mysecret
+      include=virtual_server
+      profile=true
+    register: result
+
+  - debug: var=result.bigip_facts_profile
+
+  - name: Collect only the pools and nodes changed since the last run
+    local_action: >
+      bigip_facts
+      server=lb.mydomain.com
+      user=admin
+      password=mysecret
+      include=pool,node
+      snapshot=/var/lib/cmdb/lb.mydomain.com.json
+
+  - name: Collect only the destination and default pool of virtual servers
+    local_action:
+      module: bigip_facts
+      server: lb.mydomain.com
+      user: admin
+      password: mysecret
+      include: virtual_server
+      fields:
+        virtual_server:
+          - destination
+          - default_pool_name
+
+  - name: Collect rarely changing facts through a local cache
+    local_action:
+      module: bigip_facts
+      server: lb.mydomain.com
+      user: admin
+      password: mysecret
+      include: interface,vlan,trunk,software
+      cache_dir: ~/.ansible/bigip_facts
+      cache_ttl:
+        default: 3600
+        software: 86400
+
 '''
 
 try:
@@ -111,9 +289,23 @@ except ImportError:
 else:
     bigsuds_found = True
 
+import copy
+import errno
 import fnmatch
+import hashlib
+import json
+import os
 import traceback
 import re
+import tempfile
+import threading
+import time
+import zlib
+import Queue
+
+DEFAULT_CACHE_TTL = 300
+# database variable updated by the BIG-IP whenever its configuration changes
+CHANGE_MARKER_VARIABLE = 'Configsync.LocalConfigTime'
 
 # ===========================================
 # bigip_facts module specific support methods.
@@ -126,12 +318,15 @@ class F5(object):
 
     Attributes:
         api: iControl API instance.
+        fetcher: Fetcher used to retrieve per-field attributes.
     """
 
-    def __init__(self, host, user, password, session=False):
+    def __init__(self, host, user, password, session=False, workers=1,
+                 chunk_size=0):
         self.api = bigsuds.BIGIP(hostname=host, username=user, password=password)
         if session:
             self.start_session()
+        self.fetcher = Fetcher(host, user, password, workers, chunk_size)
 
     def start_session(self):
         self.api = self.api.with_session_id()
@@ -158,6 +353,245 @@ class F5(object):
         return self.api.System.Session.get_active_folder()
 
 
+class Fetcher(object):
+    """Attribute fetcher class.
+
+    Issues the per-field get_* calls of a fact class, either sequentially
+    on the primary connection or concurrently over a bounded pool of
+    iControl sessions.
+
+    Attributes:
+        host: BIG-IP host.
+        user: BIG-IP username.
+        password: BIG-IP password.
+        workers: Maximum number of concurrent sessions.
+        sessions: Queue of idle F5 session connections.
+        projections: Dict mapping a fact class to the fields to collect.
+        chunk_size: Number of object names per request, 0 for no limit.
+        profiler: Profiler recording each call, or None.
+    """
+
+    def __init__(self, host, user, password, workers=1, chunk_size=0):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.workers = max(1, workers)
+        self.sessions = Queue.Queue()
+        self.projections = {}
+        self.chunk_size = chunk_size
+        self.profiler = None
+
+    def set_projection(self, api_class, fields):
+        self.projections[api_class] = set(fields)
+
+    def project(self, api_obj, fields):
+        selected = self.projections.get(api_obj.__class__)
+        if selected is None:
+            return fields
+        return [x for x in fields if x in selected]
+
+    def connect(self):
+        f5 = F5(self.host, self.user, self.password, session=True)
+        f5.set_active_folder("/")
+        f5.enable_recursive_query_state()
+        return f5
+
+    def acquire(self):
+        try:
+            return self.sessions.get_nowait()
+        except Queue.Empty:
+            return self.connect()
+
+    def release(self, f5):
+        self.sessions.put(f5)
+
+    def call(self, api_obj, field):
+        if self.profiler is None:
+            return getattr(api_obj, "get_" + field)()
+        start = time.time()
+        response = getattr(api_obj, "get_" + field)()
+        self.profiler.add_call(api_obj, field, time.time() - start, response)
+        return response
+
+    def fetch(self, api_obj, fields):
+        """Return a (supported_fields, responses) tuple for fields."""
+        fields = self.project(api_obj, fields)
+        if self.workers < 2 or len(fields) < 2:
+            results = [self.fetch_one(api_obj, field) for field in fields]
+        else:
+            results = self.fetch_concurrent(api_obj, fields)
+        supported_fields = []
+        responses = []
+        for field, result in zip(fields, results):
+            if result is not MethodNotFound:
+                supported_fields.append(field)
+                responses.append(result)
+        return (supported_fields, responses)
+
+    def fetch_one(self, api_obj, field):
+        try:
+            return self.call(api_obj, field)
+        except MethodNotFound:
+            return MethodNotFound
+
+    def fetch_concurrent(self, api_obj, fields):
+        jobs = Queue.Queue()
+        for i, field in enumerate(fields):
+            jobs.put((i, field))
+        results = [None] * len(fields)
+        errors = []
+        threads = []
+        for i in range(min(self.workers, len(fields))):
+            thread = threading.Thread(target=self.worker,
+                                      args=(api_obj, jobs, results, errors))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return results
+
+    def worker(self, api_obj, jobs, results, errors):
+        try:
+            f5 = self.acquire()
+        except Exception, e:
+            errors.append(e)
+            return
+        # each worker drives its own copy of the fact class bound to its
+        # own session, so no suds client is shared between threads
+        f5.fetcher.profiler = self.profiler
+        local_obj = copy.copy(api_obj)
+        local_obj.api = f5.get_api()
+        try:
+            while not errors:
+                try:
+                    i, field = jobs.get_nowait()
+                except Queue.Empty:
+                    break
+                results[i] = self.fetch_one(local_obj, field)
+        except Exception, e:
+            errors.append(e)
+        self.release(f5)
+
+
+class Profiler(object):
+    """Profiler class.
+
+    Records the wall time, call count and serialized response size of
+    iControl calls, per fact category and field. Safe to share between
+    worker threads.
+
+    Attributes:
+        categories: Dict mapping a fact class to its category name.
+        calls: Dict of per-category, per-field call statistics.
+        totals: Dict of per-category collection statistics.
+    """
+
+    def __init__(self, categories=None):
+        self.categories = categories or {}
+        self.calls = {}
+        self.totals = {}
+        self.lock = threading.Lock()
+
+    def add_call(self, api_obj, field, elapsed, response):
+        category = self.categories.get(api_obj.__class__, api_obj.__class__.__name__)
+        size = len(json.dumps(response, default=str))
+        self.lock.acquire()
+        try:
+            stats = self.calls.setdefault(category, {}).setdefault(
+                field, {'calls': 0, 'time': 0.0, 'bytes': 0})
+            stats['calls'] += 1
+            stats['time'] += elapsed
+            stats['bytes'] += size
+        finally:
+            self.lock.release()
+
+    def add_category(self, category, elapsed):
+        self.lock.acquire()
+        try:
+            calls = self.calls.get(category, {}).values()
+            self.totals[category] = {'time': elapsed,
+                                     'calls': sum([x['calls'] for x in calls]),
+                                     'bytes': sum([x['bytes'] for x in calls])}
+        finally:
+            self.lock.release()
+
+    def get_result(self):
+        return {'categories': self.totals, 'calls': self.calls}
+
+
+def filter_names(names, regex=None, key=None):
+    """Return the items of names whose name matches regex.
+
+    The list is scanned once with a compiled pattern so that only the
+    matching names are passed on to the per-attribute iControl calls.
+    key extracts the name from an item when names holds structures.
+    """
+    if regex is None:
+        return names
+    search = re.compile(regex).search
+    if key is None:
+        return [x for x in names if search(x)]
+    return [x for x in names if search(key(x))]
+
+
+class FactCache(object):
+    """Fact cache class.
+
+    On-disk cache of collected fact categories. Entries are stored as
+    zlib compressed JSON together with the time they were collected and
+    the device change marker at that time.
+
+    Attributes:
+        path: Cache directory.
+        ttls: Dict mapping a fact category to its time to live in seconds.
+    """
+
+    def __init__(self, path, ttls=None):
+        self.path = path
+        self.ttls = ttls or {}
+        try:
+            os.makedirs(self.path, 0700)
+        except OSError, e:
+            # another run may have created it in the meantime
+            if e.errno != errno.EEXIST:
+                raise
+
+    def key(self, server, user, category, fact_filter=None, fields=None):
+        if fields:
+            fields = sorted(fields)
+        data = json.dumps([server, user, category, fact_filter, fields])
+        return hashlib.sha1(data).hexdigest()
+
+    def get_ttl(self, category):
+        return self.ttls.get(category, self.ttls.get('default', DEFAULT_CACHE_TTL))
+
+    def is_fresh(self, entry, category):
+        return time.time() - entry['time'] < self.get_ttl(category)
+
+    def load(self, key):
+        try:
+            f = open(os.path.join(self.path, key), 'rb')
+            try:
+                return json.loads(zlib.decompress(f.read()))
+            finally:
+                f.close()
+        except (IOError, ValueError, zlib.error):
+            return None
+
+    def store(self, key, facts, marker=None):
+        entry = {'time': time.time(), 'marker': marker, 'facts': facts}
+        data = zlib.compress(json.dumps(entry, separators=(',', ':')))
+        fd, tmp_path = tempfile.mkstemp(dir=self.path)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        os.rename(tmp_path, os.path.join(self.path, key))
+
+
 class Interfaces(object):
     """Interfaces class.
 
@@ -170,14 +604,14 @@ class Interfaces(object):
 
     def __init__(self, api, regex=None):
         self.api = api
-        self.interfaces = api.Networking.Interfaces.get_list()
-        if regex:
-            re_filter = re.compile(regex)
-            self.interfaces = filter(re_filter.search, self.interfaces)
+        self.interfaces = filter_names(api.Networking.Interfaces.get_list(), regex)
 
     def get_list(self):
         return self.interfaces
 
+    def set_list(self, names):
+        self.interfaces = names
+
     def get_active_media(self):
         return self.api.Networking.Interfaces.get_active_media(self.interfaces)
 
@@ -275,14 +709,14 @@ class SelfIPs(object):
 
     def __init__(self, api, regex=None):
         self.api = api
-        self.self_ips = api.Networking.SelfIPV2.get_list()
-        if regex:
-            re_filter = re.compile(regex)
-            self.self_ips = filter(re_filter.search, self.self_ips)
+        self.self_ips = filter_names(api.Networking.SelfIPV2.get_list(), regex)
 
     def get_list(self):
         return self.self_ips
 
+    def set_list(self, names):
+        self.self_ips = names
+
     def get_address(self):
         return self.api.Networking.SelfIPV2.get_address(self.self_ips)
 
@@ -329,14 +763,14 @@ class Trunks(object):
 
     def __init__(self, api, regex=None):
         self.api = api
-        self.trunks = api.Networking.Trunk.get_list()
-        if regex:
-            re_filter = re.compile(regex)
-            self.trunks = filter(re_filter.search, self.trunks)
+        self.trunks = filter_names(api.Networking.Trunk.get_list(), regex)
 
     def get_list(self):
         return self.trunks
 
+    def set_list(self, names):
+        self.trunks = names
+
     def get_active_lacp_state(self):
         return self.api.Networking.Trunk.get_active_lacp_state(self.trunks)
 
@@ -389,14 +823,14 @@ class Vlans(object):
 
     def __init__(self, api, regex=None):
         self.api = api
-        self.vlans = api.Networking.VLAN.get_list()
-        if regex:
-            re_filter = re.compile(regex)
-            self.vlans = filter(re_filter.search, self.vlans)
+        self.vlans = filter_names(api.Networking.VLAN.get_list(), regex)
 
     def get_list(self):
         return self.vlans
 
+    def set_list(self, names):
+        self.vlans = names
+
     def get_auto_lasthop(self):
         return self.api.Networking.VLAN.get_auto_lasthop(self.vlans)
 
@@ -481,16 +915,20 @@ class VirtualServers(object):
         virtual_servers: List of virtual servers.
     """
 
-    def __init__(self, api, regex=None):
+    def __init__(self, api, regex=None, names=None):
         self.api = api
-        self.virtual_servers = api.LocalLB.VirtualServer.get_list()
-        if regex:
-            re_filter = re.compile(regex)
-            self.virtual_servers = filter(re_filter.search, self.virtual_servers)
+        if names is not None:
+            # names already listed and filtered by the caller
+            self.virtual_servers = names
+        else:
+            self.virtual_servers = filter_names(api.LocalLB.VirtualServer.get_list(), regex)
 
     def get_list(self):
         return self.virtual_servers
 
+    def set_list(self, names):
+        self.virtual_servers = names
+
     def get_actual_hardware_acceleration(self):
         return self.api.LocalLB.VirtualServer.get_actual_hardware_acceleration(self.virtual_servers)
 
@@ -631,16 +1069,20 @@ class Pools(object):
         pool_names: List of pool names.
     """
 
-    def __init__(self, api, regex=None):
+    def __init__(self, api, regex=None, names=None):
         self.api = api
-        self.pool_names = api.LocalLB.Pool.get_list()
-        if regex:
-            re_filter = re.compile(regex)
-            self.pool_names = filter(re_filter.search, self.pool_names)
+        if names is not None:
+            # names already listed and filtered by the caller
+            self.pool_names = names
+        else:
+            self.pool_names = filter_names(api.LocalLB.Pool.get_list(), regex)
 
     def get_list(self):
         return self.pool_names
 
+    def set_list(self, names):
+        self.pool_names = names
+
     def get_action_on_service_down(self):
         return self.api.LocalLB.Pool.get_action_on_service_down(self.pool_names)
 
@@ -738,14 +1180,14 @@ class Devices(object):
 
     def __init__(self, api, regex=None):
         self.api = api
-        self.devices = api.Management.Device.get_list()
-        if regex:
-            re_filter = re.compile(regex)
-            self.devices = filter(re_filter.search, self.devices)
+        self.devices = filter_names(api.Management.Device.get_list(), regex)
 
     def get_list(self):
         return self.devices
 
+    def set_list(self, names):
+        self.devices = names
+
     def get_active_modules(self):
         return self.api.Management.Device.get_active_modules(self.devices)
 
@@ -843,14 +1285,14 @@ class DeviceGroups(object):
 
     def __init__(self, api, regex=None):
         self.api = api
-        self.device_groups = api.Management.DeviceGroup.get_list()
-        if regex:
-            re_filter = re.compile(regex)
-            self.device_groups = filter(re_filter.search, self.device_groups)
+        self.device_groups = filter_names(api.Management.DeviceGroup.get_list(), regex)
 
     def get_list(self):
         return self.device_groups
 
+    def set_list(self, names):
+        self.device_groups = names
+
     def get_all_preferred_active(self):
         return self.api.Management.DeviceGroup.get_all_preferred_active(self.device_groups)
 
@@ -891,14 +1333,14 @@ class TrafficGroups(object):
 
     def __init__(self, api, regex=None):
         self.api = api
-        self.traffic_groups = api.Management.TrafficGroup.get_list()
-        if regex:
-            re_filter = re.compile(regex)
-            self.traffic_groups = filter(re_filter.search, self.traffic_groups)
+        self.traffic_groups = filter_names(api.Management.TrafficGroup.get_list(), regex)
 
     def get_list(self):
         return self.traffic_groups
 
+    def set_list(self, names):
+        self.traffic_groups = names
+
     def get_auto_failback_enabled_state(self):
         return self.api.Management.TrafficGroup.get_auto_failback_enabled_state(self.traffic_groups)
 
@@ -939,14 +1381,14 @@ class Rules(object):
 
     def __init__(self, api, regex=None):
         self.api = api
-        self.rules = api.LocalLB.Rule.get_list()
-        if regex:
-            re_filter = re.compile(regex)
-            self.traffic_groups = filter(re_filter.search, self.rules)
+        self.rules = filter_names(api.LocalLB.Rule.get_list(), regex)
 
     def get_list(self):
         return self.rules
 
+    def set_list(self, names):
+        self.rules = names
+
     def get_description(self):
         return self.api.LocalLB.Rule.get_description(rule_names=self.rules)
 
@@ -969,16 +1411,20 @@ class Nodes(object):
         nodes: List of nodes.
     """
 
-    def __init__(self, api, regex=None):
+    def __init__(self, api, regex=None, names=None):
         self.api = api
-        self.nodes = api.LocalLB.NodeAddressV2.get_list()
-        if regex:
-            re_filter = re.compile(regex)
-            self.nodes = filter(re_filter.search, self.nodes)
+        if names is not None:
+            # names already listed and filtered by the caller
+            self.nodes = names
+        else:
+            self.nodes = filter_names(api.LocalLB.NodeAddressV2.get_list(), regex)
 
     def get_list(self):
         return self.nodes
 
+    def set_list(self, names):
+        self.nodes = names
+
     def get_address(self):
         return self.api.LocalLB.NodeAddressV2.get_address(nodes=self.nodes)
 
@@ -1023,16 +1469,20 @@ class VirtualAddresses(object):
         virtual_addresses: List of virtual addresses.
     """
 
-    def __init__(self, api, regex=None):
+    def __init__(self, api, regex=None, names=None):
         self.api = api
-        self.virtual_addresses = api.LocalLB.VirtualAddressV2.get_list()
-        if regex:
-            re_filter = re.compile(regex)
-            self.virtual_addresses = filter(re_filter.search, self.virtual_addresses)
+        if names is not None:
+            # names already listed and filtered by the caller
+            self.virtual_addresses = names
+        else:
+            self.virtual_addresses = filter_names(api.LocalLB.VirtualAddressV2.get_list(), regex)
 
     def get_list(self):
         return self.virtual_addresses
 
+    def set_list(self, names):
+        self.virtual_addresses = names
+
     def get_address(self):
         return self.api.LocalLB.VirtualAddressV2.get_address(self.virtual_addresses)
 
@@ -1082,14 +1532,14 @@ class AddressClasses(object):
 
     def __init__(self, api, regex=None):
         self.api = api
-        self.address_classes = api.LocalLB.Class.get_address_class_list()
-        if regex:
-            re_filter = re.compile(regex)
-            self.address_classes = filter(re_filter.search, self.address_classes)
+        self.address_classes = filter_names(api.LocalLB.Class.get_address_class_list(), regex)
 
     def get_list(self):
         return self.address_classes
 
+    def set_list(self, names):
+        self.address_classes = names
+
     def get_address_class(self):
         key = self.api.LocalLB.Class.get_address_class(self.address_classes)
         value = self.api.LocalLB.Class.get_address_class_member_data_value(key)
@@ -1113,12 +1563,10 @@ class Certificates(object):
 
     def __init__(self, api, regex=None, mode="MANAGEMENT_MODE_DEFAULT"):
         self.api = api
-        self.certificate_list = api.Management.KeyCertificate.get_certificate_list(mode=mode)
+        self.certificate_list = filter_names(
+            api.Management.KeyCertificate.get_certificate_list(mode=mode), regex,
+            lambda x: x['certificate']['cert_info']['id'])
         self.certificates = [x['certificate']['cert_info']['id'] for x in self.certificate_list]
-        if regex:
-            re_filter = re.compile(regex)
-            self.certificates = filter(re_filter.search, self.certificates)
-            self.certificate_list = [x for x in self.certificate_list if x['certificate']['cert_info']['id'] in self.certificates]
 
     def get_list(self):
         return self.certificates
@@ -1140,12 +1588,10 @@ class Keys(object):
 
     def __init__(self, api, regex=None, mode="MANAGEMENT_MODE_DEFAULT"):
         self.api = api
-        self.key_list = api.Management.KeyCertificate.get_key_list(mode=mode)
+        self.key_list = filter_names(
+            api.Management.KeyCertificate.get_key_list(mode=mode), regex,
+            lambda x: x['key_info']['id'])
         self.keys = [x['key_info']['id'] for x in self.key_list]
-        if regex:
-            re_filter = re.compile(regex)
-            self.keys = filter(re_filter.search, self.keys)
-            self.key_list = [x for x in self.key_list if x['key_info']['id'] in self.keys]
 
     def get_list(self):
         return self.keys
@@ -1166,14 +1612,14 @@ class ProfileClientSSL(object):
 
     def __init__(self, api, regex=None):
         self.api = api
-        self.profiles = api.LocalLB.ProfileClientSSL.get_list()
-        if regex:
-            re_filter = re.compile(regex)
-            self.profiles = filter(re_filter.search, self.profiles)
+        self.profiles = filter_names(api.LocalLB.ProfileClientSSL.get_list(), regex)
 
     def get_list(self):
         return self.profiles
 
+    def set_list(self, names):
+        self.profiles = names
+
     def get_alert_timeout(self):
         return self.api.LocalLB.ProfileClientSSL.get_alert_timeout(self.profiles)
 
@@ -1356,35 +1802,45 @@ class SystemInfo(object):
         return self.api.System.SystemInfo.get_uptime()
 
 
-def generate_dict(api_obj, fields):
+def generate_dict(api_obj, fields, fetcher=None):
     result_dict = {}
-    lists = []
-    supported_fields = []
-    if api_obj.get_list():
-        for field in fields:
-            try:
-                api_response = getattr(api_obj, "get_" + field)()
-            except MethodNotFound:
-                pass
-            else:
-                lists.append(api_response)
-                supported_fields.append(field)
-        for i, j in enumerate(api_obj.get_list()):
-            temp = {}
-            temp.update([(item[0], item[1][i]) for item in zip(supported_fields, lists)])
-            result_dict[j] = temp
+    if fetcher is None:
+        fetcher = Fetcher(None, None, None)
+    for chunk in generate_dict_chunks(api_obj, fields, fetcher):
+        result_dict.update(chunk)
     return result_dict
 
-def generate_simple_dict(api_obj, fields):
-    result_dict = {}
-    for field in fields:
-        try:
-            api_response = getattr(api_obj, "get_" + field)()
-        except MethodNotFound:
-            pass
+def generate_dict_chunks(api_obj, fields, fetcher):
+    """Yield per-object attribute dicts for one window of names at a time.
+
+    Only the responses for the current window are held in memory; their
+    per-field lists are released before the next window is requested.
+    """
+    names = api_obj.get_list()
+    if not names:
+        return
+    chunk_size = fetcher.chunk_size or len(names)
+    for start in range(0, len(names), chunk_size):
+        window = names[start:start + chunk_size]
+        if len(window) < len(names):
+            window_obj = copy.copy(api_obj)
+            window_obj.set_list(window)
         else:
-            result_dict[field] = api_response
-    return result_dict
+            window_obj = api_obj
+        supported_fields, lists = fetcher.fetch(window_obj, fields)
+        chunk = {}
+        for i, j in enumerate(window):
+            temp = {}
+            temp.update([(item[0], item[1][i]) for item in zip(supported_fields, lists)])
+            chunk[j] = temp
+        del lists
+        yield chunk
+
+def generate_simple_dict(api_obj, fields, fetcher=None):
+    if fetcher is None:
+        fetcher = Fetcher(None, None, None)
+    supported_fields, responses = fetcher.fetch(api_obj, fields)
+    return dict(zip(supported_fields, responses))
 
 def generate_interface_dict(f5, regex):
     interfaces = Interfaces(f5.get_api(), regex)
@@ -1398,7 +1854,7 @@ def generate_interface_dict(f5, regex):
               'sfp_media_state', 'stp_active_edge_port_state',
               'stp_enabled_state', 'stp_link_type',
               'stp_protocol_detection_reset_state']
-    return generate_dict(interfaces, fields)
+    return generate_dict(interfaces, fields, f5.fetcher)
 
 def generate_self_ip_dict(f5, regex):
     self_ips = SelfIPs(f5.get_api(), regex)
@@ -1406,7 +1862,7 @@ def generate_self_ip_dict(f5, regex):
               'enforced_firewall_policy', 'floating_state', 'fw_rule',
               'netmask', 'staged_firewall_policy', 'traffic_group',
               'vlan', 'is_traffic_group_inherited']
-    return generate_dict(self_ips, fields)
+    return generate_dict(self_ips, fields, f5.fetcher)
 
 def generate_trunk_dict(f5, regex):
     trunks = Trunks(f5.get_api(), regex)
@@ -1415,7 +1871,7 @@ def generate_trunk_dict(f5, regex):
               'lacp_timeout_option', 'link_selection_policy', 'media_speed',
               'media_status', 'operational_member_count', 'stp_enabled_state',
               'stp_protocol_detection_reset_state']
-    return generate_dict(trunks, fields)
+    return generate_dict(trunks, fields, f5.fetcher)
 
 def generate_vlan_dict(f5, regex):
     vlans = Vlans(f5.get_api(), regex)
@@ -1426,10 +1882,10 @@ def generate_vlan_dict(f5, regex):
               'sflow_poll_interval', 'sflow_poll_interval_global',
               'sflow_sampling_rate', 'sflow_sampling_rate_global',
               'source_check_state', 'true_mac_address', 'vlan_id']
-    return generate_dict(vlans, fields)
+    return generate_dict(vlans, fields, f5.fetcher)
 
-def generate_vs_dict(f5, regex):
-    virtual_servers = VirtualServers(f5.get_api(), regex)
+def generate_vs_dict(f5, regex, names=None):
+    virtual_servers = VirtualServers(f5.get_api(), regex, names)
     fields = ['actual_hardware_acceleration', 'authentication_profile',
               'auto_lasthop', 'bw_controller_policy', 'clone_pool',
               'cmp_enable_mode', 'connection_limit', 'connection_mirror_state',
@@ -1446,10 +1902,10 @@ def generate_vs_dict(f5, regex):
               'source_address_translation_type', 'source_port_behavior',
               'staged_firewall_policy', 'translate_address_state',
               'translate_port_state', 'type', 'vlan', 'wildmask']
-    return generate_dict(virtual_servers, fields)
+    return generate_dict(virtual_servers, fields, f5.fetcher)
 
-def generate_pool_dict(f5, regex):
-    pools = Pools(f5.get_api(), regex)
+def generate_pool_dict(f5, regex, names=None):
+    pools = Pools(f5.get_api(), regex, names)
     fields = ['action_on_service_down', 'active_member_count',
               'aggregate_dynamic_ratio', 'allow_nat_state',
               'allow_snat_state', 'client_ip_tos', 'client_link_qos',
@@ -1462,7 +1918,7 @@ def generate_pool_dict(f5, regex):
               'queue_on_connection_limit_state', 'queue_time_limit',
               'reselect_tries', 'server_ip_tos', 'server_link_qos',
               'simple_timeout', 'slow_ramp_time']
-    return generate_dict(pools, fields)
+    return generate_dict(pools, fields, f5.fetcher)
 
 def generate_device_dict(f5, regex):
     devices = Devices(f5.get_api(), regex)
@@ -1474,7 +1930,7 @@ def generate_device_dict(f5, regex):
               'optional_modules', 'platform_id', 'primary_mirror_address',
               'product', 'secondary_mirror_address', 'software_version',
               'timelimited_modules', 'timezone', 'unicast_addresses']
-    return generate_dict(devices, fields)
+    return generate_dict(devices, fields, f5.fetcher)
 
 def generate_device_group_dict(f5, regex):
     device_groups = DeviceGroups(f5.get_api(), regex)
@@ -1482,7 +1938,7 @@ def generate_device_group_dict(f5, regex):
               'device', 'full_load_on_sync_state',
               'incremental_config_sync_size_maximum',
               'network_failover_enabled_state', 'sync_status', 'type']
-    return generate_dict(device_groups, fields)
+    return generate_dict(device_groups, fields, f5.fetcher)
 
 def generate_traffic_group_dict(f5, regex):
     traffic_groups = TrafficGroups(f5.get_api(), regex)
@@ -1490,33 +1946,33 @@ def generate_traffic_group_dict(f5, regex):
               'default_device', 'description', 'ha_load_factor',
               'ha_order', 'is_floating', 'mac_masquerade_address',
               'unit_id']
-    return generate_dict(traffic_groups, fields)
+    return generate_dict(traffic_groups, fields, f5.fetcher)
 
 def generate_rule_dict(f5, regex):
     rules = Rules(f5.get_api(), regex)
     fields = ['definition', 'description', 'ignore_vertification',
               'verification_status']
-    return generate_dict(rules, fields)
+    return generate_dict(rules, fields, f5.fetcher)
 
-def generate_node_dict(f5, regex):
-    nodes = Nodes(f5.get_api(), regex)
+def generate_node_dict(f5, regex, names=None):
+    nodes = Nodes(f5.get_api(), regex, names)
     fields = ['address', 'connection_limit', 'description', 'dynamic_ratio',
               'monitor_instance', 'monitor_rule', 'monitor_status',
               'object_status', 'rate_limit', 'ratio', 'session_status']
-    return generate_dict(nodes, fields)
+    return generate_dict(nodes, fields, f5.fetcher)
 
-def generate_virtual_address_dict(f5, regex):
-    virtual_addresses = VirtualAddresses(f5.get_api(), regex)
+def generate_virtual_address_dict(f5, regex, names=None):
+    virtual_addresses = VirtualAddresses(f5.get_api(), regex, names)
     fields = ['address', 'arp_state', 'auto_delete_state', 'connection_limit',
               'description', 'enabled_state', 'icmp_echo_state',
               'is_floating_state', 'netmask', 'object_status',
               'route_advertisement_state', 'traffic_group']
-    return generate_dict(virtual_addresses, fields)
+    return generate_dict(virtual_addresses, fields, f5.fetcher)
 
 def generate_address_class_dict(f5, regex):
     address_classes = AddressClasses(f5.get_api(), regex)
     fields = ['address_class', 'description']
-    return generate_dict(address_classes, fields)
+    return generate_dict(address_classes, fields, f5.fetcher)
 
 def generate_certificate_dict(f5, regex):
     certificates = Certificates(f5.get_api(), regex)
@@ -1547,7 +2003,7 @@ def generate_client_ssl_profile_dict(f5, regex):
               'server_name', 'session_ticket_state', 'sni_default_state',
               'sni_require_state', 'ssl_option', 'strict_resume_state',
               'unclean_shutdown_state', 'is_base_profile', 'is_system_profile']
-    return generate_dict(profiles, fields)
+    return generate_dict(profiles, fields, f5.fetcher)
 
 def generate_system_info_dict(f5):
     system_info = SystemInfo(f5.get_api())
@@ -1559,13 +2015,164 @@ def generate_system_info_dict(f5):
               'product_information', 'pva_version', 'system_id',
               'system_information', 'time',
               'time_zone', 'uptime']
-    return generate_simple_dict(system_info, fields)
+    return generate_simple_dict(system_info, fields, f5.fetcher)
 
 def generate_software_list(f5):
     software = Software(f5.get_api())
     software_list = software.get_all_software_status()
     return software_list
 
+def enter_root_folder(f5):
+    """Switch to the root folder with recursive queries enabled.
+
+    Returns the previous (active_folder, recursive_query_state) pair.
+    """
+    saved_active_folder = f5.get_active_folder()
+    saved_recursive_query_state = f5.get_recursive_query_state()
+    if saved_active_folder != "/":
+        f5.set_active_folder("/")
+    if saved_recursive_query_state != "STATE_ENABLED":
+        f5.enable_recursive_query_state()
+    return (saved_active_folder, saved_recursive_query_state)
+
+def restore_folder(f5, saved_state):
+    saved_active_folder, saved_recursive_query_state = saved_state
+    if saved_active_folder and saved_active_folder != "/":
+        f5.set_active_folder(saved_active_folder)
+    if saved_recursive_query_state and \
+       saved_recursive_query_state != "STATE_ENABLED":
+        f5.set_recursive_query_state(saved_recursive_query_state)
+
+def collect_category(f5, category, collector, regex, names=None):
+    profiler = f5.fetcher.profiler
+    start = time.time()
+    if category in ('software', 'system_info'):
+        result = collector(f5)
+    elif names is not None:
+        result = collector(f5, regex, names)
+    else:
+        result = collector(f5, regex)
+    if profiler is not None:
+        profiler.add_category(category, time.time() - start)
+    return result
+
+def collect_concurrently(connect, jobs, workers):
+    """Collect (category, collector, regex, names) jobs over up to workers sessions.
+
+    connect is called once per worker thread to open its own session;
+    the active folder and recursive query state of that session are
+    saved before collecting and restored afterwards.
+    """
+    queue = Queue.Queue()
+    for job in jobs:
+        queue.put(job)
+    results = {}
+    errors = []
+
+    def worker():
+        try:
+            f5 = connect()
+            saved_state = enter_root_folder(f5)
+        except Exception, e:
+            errors.append(e)
+            return
+        try:
+            while not errors:
+                try:
+                    category, collector, regex, names = queue.get_nowait()
+                except Queue.Empty:
+                    break
+                results[category] = collect_category(f5, category, collector, regex, names)
+        except Exception, e:
+            errors.append(e)
+        restore_folder(f5, saved_state)
+
+    threads = []
+    for i in range(min(workers, len(jobs))):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+def fingerprint(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str)).hexdigest()
+
+def load_snapshot(path):
+    try:
+        f = open(path)
+    except IOError:
+        return {}
+    try:
+        return json.load(f)
+    finally:
+        f.close()
+
+def save_snapshot(path, snapshot):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        os.write(fd, json.dumps(snapshot, separators=(',', ':')))
+    finally:
+        os.close(fd)
+    os.rename(tmp_path, path)
+
+def probe_objects(f5, api_class, regex, previous):
+    """Read the status of every object of a category in one call.
+
+    Returns a (probes, refetch) tuple, where probes maps each object name
+    to a fingerprint of its status and refetch lists the names, in device
+    order, that are new or whose status changed since the previous
+    snapshot.
+    """
+    api_obj = api_class(f5.get_api(), regex)
+    names = api_obj.get_list()
+    if not names:
+        return ({}, [])
+    probes = dict(zip(names, [fingerprint(x) for x in api_obj.get_object_status()]))
+    refetch = [x for x in names
+               if x not in previous or previous[x].get('probe') != probes[x]]
+    return (probes, refetch)
+
+def diff_category(category_facts, previous, probes=None):
+    """Compare collected facts with the fingerprints of a previous run.
+
+    Objects only present in probes were not refetched and keep their
+    previous fingerprint. Returns a (facts, diff, fingerprints) tuple
+    where facts holds only the added and changed objects.
+    """
+    current = {}
+    for name, value in category_facts.items():
+        current[name] = {'hash': fingerprint(value)}
+    for name, probe in (probes or {}).items():
+        if name not in current:
+            current[name] = {'hash': previous[name]['hash']}
+        current[name]['probe'] = probe
+    added = [x for x in current if x not in previous]
+    changed = [x for x in current
+               if x in previous and previous[x]['hash'] != current[x]['hash']]
+    removed = [x for x in previous if x not in current]
+    diff_facts = dict([(x, category_facts[x]) for x in added + changed])
+    diff = {'added': sorted(added), 'changed': sorted(changed),
+            'removed': sorted(removed)}
+    return (diff_facts, diff, current)
+
+def get_change_marker(f5):
+    try:
+        variables = f5.get_api().Management.DBVariable.query([CHANGE_MARKER_VARIABLE])
+    except (bigsuds.OperationFailed, MethodNotFound):
+        return None
+    if variables:
+        return variables[0]['value']
+    return None
+
+def get_unknown_fields(api_class, fields):
+    return [x for x in fields
+            if x == 'list' or not callable(getattr(api_class, 'get_' + x, None))]
+
 
 def main():
     module = AnsibleModule(
@@ -1576,6 +2183,16 @@ def main():
             session = dict(type='bool', default=False),
             include = dict(type='list', required=True),
             filter = dict(type='str', required=False),
+            workers = dict(type='int', default=1),
+            chunk_size = dict(type='int', default=0),
+            category_workers = dict(type='int', default=1),
+            profile = dict(type='bool', default=False),
+            snapshot = dict(type='str', required=False),
+            fingerprints = dict(type='dict', required=False),
+            skip_unchanged = dict(type='bool', default=False),
+            fields = dict(type='dict', required=False),
+            cache_dir = dict(type='str', required=False),
+            cache_ttl = dict(type='dict', required=False),
         )
     )
 
@@ -1587,6 +2204,15 @@ def main():
     password = module.params['password']
     session = module.params['session']
     fact_filter = module.params['filter']
+    workers = module.params['workers']
+    if workers < 1:
+        module.fail_json(msg="workers must be a positive integer")
+    chunk_size = module.params['chunk_size']
+    if chunk_size < 0:
+        module.fail_json(msg="chunk_size must be zero or a positive integer")
+    category_workers = module.params['category_workers']
+    if category_workers < 1:
+        module.fail_json(msg="category_workers must be a positive integer")
     if fact_filter:
         regex = fnmatch.translate(fact_filter)
     else:
@@ -1600,64 +2226,181 @@ def main():
     include_test = map(lambda x: x in valid_includes, include)
     if not all(include_test):
         module.fail_json(msg="value of include must be one or more of: %s, got: %s" % (",".join(valid_includes), ",".join(include)))
+    fact_classes = {'address_class': AddressClasses,
+                    'client_ssl_profile': ProfileClientSSL,
+                    'device_group': DeviceGroups, 'interface': Interfaces,
+                    'node': Nodes, 'pool': Pools, 'rule': Rules,
+                    'self_ip': SelfIPs, 'system_info': SystemInfo,
+                    'traffic_group': TrafficGroups, 'trunk': Trunks,
+                    'virtual_address': VirtualAddresses,
+                    'virtual_server': VirtualServers, 'vlan': Vlans}
+    fields = module.params['fields'] or {}
+    for category, category_fields in fields.items():
+        if category not in fact_classes:
+            module.fail_json(msg="fields can only be selected for: %s, got: %s" % (",".join(sorted(fact_classes)), category))
+        if isinstance(category_fields, basestring):
+            category_fields = category_fields.split(',')
+        category_fields = [x.strip().lower() for x in category_fields]
+        unknown_fields = get_unknown_fields(fact_classes[category], category_fields)
+        if unknown_fields:
+            module.fail_json(msg="unknown %s fields: %s" % (category, ",".join(unknown_fields)))
+        fields[category] = category_fields
+
+    cache = None
+    if module.params['cache_dir']:
+        try:
+            cache_ttl = dict([(k.lower(), int(v)) for k, v in
+                              (module.params['cache_ttl'] or {}).items()])
+        except (TypeError, ValueError):
+            module.fail_json(msg="cache_ttl values must be a number of seconds")
+        if [x for x in cache_ttl.values() if x < 0]:
+            module.fail_json(msg="cache_ttl values must not be negative")
+        try:
+            cache = FactCache(os.path.expanduser(module.params['cache_dir']), cache_ttl)
+        except OSError, e:
+            module.fail_json(msg="unable to create cache_dir: %s" % e)
+
+    collectors = (('interface', generate_interface_dict),
+                  ('self_ip', generate_self_ip_dict),
+                  ('trunk', generate_trunk_dict),
+                  ('vlan', generate_vlan_dict),
+                  ('virtual_server', generate_vs_dict),
+                  ('pool', generate_pool_dict),
+                  ('device', generate_device_dict),
+                  ('device_group', generate_device_group_dict),
+                  ('traffic_group', generate_traffic_group_dict),
+                  ('rule', generate_rule_dict),
+                  ('node', generate_node_dict),
+                  ('virtual_address', generate_virtual_address_dict),
+                  ('address_class', generate_address_class_dict),
+                  ('software', generate_software_list),
+                  ('certificate', generate_certificate_dict),
+                  ('key', generate_key_dict),
+                  ('client_ssl_profile', generate_client_ssl_profile_dict),
+                  ('system_info', generate_system_info_dict))
+
+    snapshot = module.params['snapshot']
+    if snapshot:
+        snapshot = os.path.expanduser(snapshot)
+        try:
+            previous = load_snapshot(snapshot)
+        except ValueError, e:
+            module.fail_json(msg="unable to parse snapshot %s: %s" % (snapshot, e))
+    else:
+        previous = module.params['fingerprints']
+    diff_mode = previous is not None
+    if diff_mode:
+        if not isinstance(previous, dict):
+            module.fail_json(msg="fingerprints must map categories to objects")
+        for category, category_fingerprints in previous.items():
+            if not isinstance(category_fingerprints, dict):
+                module.fail_json(msg="fingerprints of %s must map object names to fingerprints" % category)
+            for name, value in category_fingerprints.items():
+                if isinstance(value, basestring):
+                    category_fingerprints[name] = {'hash': value}
+                elif not isinstance(value, dict) or 'hash' not in value:
+                    module.fail_json(msg="invalid fingerprint of %s %s" % (category, name))
+    skip_unchanged = diff_mode and module.params['skip_unchanged']
+    probed_categories = ('node', 'pool', 'virtual_address', 'virtual_server')
+
+    profiler = None
+    if module.params['profile']:
+        profiler = Profiler(dict([(v, k) for k, v in fact_classes.items()]))
+
+    def connect(session):
+        f5 = F5(server, user, password, session, workers, chunk_size)
+        f5.fetcher.profiler = profiler
+        for category, category_fields in fields.items():
+            f5.fetcher.set_projection(fact_classes[category], category_fields)
+        return f5
 
     try:
         facts = {}
+        cache_entries = {}
+        pending = []
+        probes = {}
+
+        for category, collector in collectors:
+            if category not in include:
+                continue
+            if cache:
+                key = cache.key(server, user, category, fact_filter, fields.get(category))
+                entry = cache.load(key)
+                if entry is not None and cache.is_fresh(entry, category):
+                    facts[category] = entry['facts']
+                    continue
+                cache_entries[category] = (key, entry)
+            pending.append((category, collector))
+
+        if len(pending) > 0:
+            f5 = connect(session)
+            saved_state = enter_root_folder(f5)
+
+            marker = None
+            if cache:
+                marker = get_change_marker(f5)
+                jobs = []
+                for category, collector in pending:
+                    key, entry = cache_entries[category]
+                    # expired entries are still valid if the configuration
+                    # has not changed since they were collected
+                    if entry is not None and marker is not None and \
+                       entry['marker'] == marker:
+                        facts[category] = entry['facts']
+                        cache.store(key, entry['facts'], marker)
+                    else:
+                        jobs.append((category, collector, regex, None))
+            else:
+                jobs = [(category, collector, regex, None) for category, collector in pending]
+
+            if skip_unchanged:
+                # narrow probed categories down to the objects whose status
+                # moved; the others keep their previous fingerprint
+                for i, (category, collector, name_regex, names) in enumerate(jobs):
+                    if category in probed_categories and category in previous:
+                        probes[category], refetch = probe_objects(
+                            f5, fact_classes[category], regex, previous[category])
+                        jobs[i] = (category, collector, regex, refetch)
+                partial = [x[0] for x in jobs if x[3] is not None]
+                for category, collector, name_regex, names in jobs:
+                    if category in partial and not names:
+                        facts[category] = {}
+                jobs = [x for x in jobs if x[0] not in partial or x[3]]
+            else:
+                partial = []
+
+            if category_workers > 1 and len(jobs) > 1:
+                collected = collect_concurrently(lambda: connect(True), jobs,
+                                                 category_workers)
+            else:
+                collected = {}
+                for category, collector, name_regex, names in jobs:
+                    collected[category] = collect_category(f5, category, collector, name_regex, names)
 
-        if len(include) > 0:
-            f5 = F5(server, user, password, session)
-            saved_active_folder = f5.get_active_folder()
-            saved_recursive_query_state = f5.get_recursive_query_state()
-            if saved_active_folder != "/":
-                f5.set_active_folder("/")
-            if saved_recursive_query_state != "STATE_ENABLED":
-                f5.enable_recursive_query_state()
-
-            if 'interface' in include:
-                facts['interface'] = generate_interface_dict(f5, regex)
-            if 'self_ip' in include:
-                facts['self_ip'] = generate_self_ip_dict(f5, regex)
-            if 'trunk' in include:
-                facts['trunk'] = generate_trunk_dict(f5, regex)
-            if 'vlan' in include:
-                facts['vlan'] = generate_vlan_dict(f5, regex)
-            if 'virtual_server' in include:
-                facts['virtual_server'] = generate_vs_dict(f5, regex)
-            if 'pool' in include:
-                facts['pool'] = generate_pool_dict(f5, regex)
-            if 'device' in include:
-                facts['device'] = generate_device_dict(f5, regex)
-            if 'device_group' in include:
-                facts['device_group'] = generate_device_group_dict(f5, regex)
-            if 'traffic_group' in include:
-                facts['traffic_group'] = generate_traffic_group_dict(f5, regex)
-            if 'rule' in include:
-                facts['rule'] = generate_rule_dict(f5, regex)
-            if 'node' in include:
-                facts['node'] = generate_node_dict(f5, regex)
-            if 'virtual_address' in include:
-                facts['virtual_address'] = generate_virtual_address_dict(f5, regex)
-            if 'address_class' in include:
-                facts['address_class'] = generate_address_class_dict(f5, regex)
-            if 'software' in include:
-                facts['software'] = generate_software_list(f5)
-            if 'certificate' in include:
-                facts['certificate'] = generate_certificate_dict(f5, regex)
-            if 'key' in include:
-                facts['key'] = generate_key_dict(f5, regex)
-            if 'client_ssl_profile' in include:
-                facts['client_ssl_profile'] = generate_client_ssl_profile_dict(f5, regex)
-            if 'system_info' in include:
-                facts['system_info'] = generate_system_info_dict(f5)
+            for category, category_facts in collected.items():
+                facts[category] = category_facts
+                if cache and category not in partial:
+                    cache.store(cache_entries[category][0], category_facts, marker)
 
             # restore saved state
-            if saved_active_folder and saved_active_folder != "/":
-                f5.set_active_folder(saved_active_folder)
-            if saved_recursive_query_state and \
-               saved_recursive_query_state != "STATE_ENABLED":
-                f5.set_recursive_query_state(saved_recursive_query_state)
+            restore_folder(f5, saved_state)
 
         result = {'ansible_facts': facts}
+        if diff_mode:
+            result['bigip_facts_diff'] = {}
+            result['bigip_facts_fingerprints'] = {}
+            for category in facts.keys():
+                if category in ('software', 'system_info'):
+                    continue
+                facts[category], result['bigip_facts_diff'][category], \
+                    result['bigip_facts_fingerprints'][category] = diff_category(
+                        facts[category], previous.get(category, {}),
+                        probes.get(category))
+            if snapshot:
+                previous.update(result['bigip_facts_fingerprints'])
+                save_snapshot(snapshot, previous)
+        if profiler is not None:
+            result['bigip_facts_profile'] = profiler.get_result()
 
     except Exception, e:
         module.fail_json(msg="received exception: %s\ntraceback: %s" % (e, traceback.format_exc()))
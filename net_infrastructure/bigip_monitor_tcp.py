@@ -57,8 +57,8 @@ options:
         choices: ['present', 'absent']
     name:
         description:
-            - Monitor name
-        required: true
+            - Monitor name. Required unless I(monitors) is used.
+        required: false
         default: null
         aliases: ['monitor']
     partition:
@@ -131,6 +131,18 @@ options:
               from the node. The default API setting is 0.
         required: false
         default: none
+    monitors:
+        description:
+            - List of monitors to manage in one run instead of a single I(name).
+              Each item is a dictionary with a C(name) key and optionally any
+              of the other monitor options, including C(state), which default
+              to the module level values. The existing templates are listed
+              once, then missing monitors are created, changed ones updated
+              and absent ones deleted with one call per action. The changes
+              made to each monitor are returned in C(monitors).
+        required: false
+        default: null
+        version_added: "1.9"
 '''
 
 EXAMPLES = '''
@@ -170,6 +182,21 @@ EXAMPLES = '''
   with_flattened:
   - f5monitors-tcp
   - f5monitors-halftcp
+- name: BIGIP F5 | Converge all TCP Monitors at once
+  local_action:
+    module:             bigip_monitor_tcp
+    server:             "{{ f5server }}"
+    user:               "{{ f5user }}"
+    password:           "{{ f5password }}"
+    monitors:
+      - name:           smtp
+        send:           "HELO monitor"
+        receive:        "250"
+      - name:           db-half-open
+        type:           tcp_half_open
+        parent:         tcp_half_open
+      - name:           legacy-tcp
+        state:          absent
 
 '''
 
@@ -216,10 +243,12 @@ def check_monitor_exists(module, api, monitor, parent):
     return result
 
 
-def create_monitor(api, monitor, template_attributes):
+def create_monitor(api, monitor, template_attributes, template_type=None):
 
+    if template_type is None:
+        template_type = TEMPLATE_TYPE
     try: 
-        api.LocalLB.Monitor.create_template(templates=[{'template_name': monitor, 'template_type': TEMPLATE_TYPE}], template_attributes=[template_attributes])
+        api.LocalLB.Monitor.create_template(templates=[{'template_name': monitor, 'template_type': template_type}], template_attributes=[template_attributes])
     except bigsuds.OperationFailed, e:
         if "already exists" in str(e):
             return False
@@ -243,59 +272,167 @@ def delete_monitor(api, monitor):
     return True
 
 
-def check_string_property(api, monitor, str_property):
+def get_string_properties(api, monitors, property_types):
+
+    # monitors and property_types are parallel arrays, so a single call
+    # reads any number of properties of any number of templates
+    return api.LocalLB.Monitor.get_template_string_property(monitors, property_types)
+
+
+def set_string_properties(api, monitors, str_properties):
+
+    api.LocalLB.Monitor.set_template_string_property(template_names=monitors, values=str_properties)
+
+
+def get_integer_properties(api, monitors, property_types):
+
+    return api.LocalLB.Monitor.get_template_integer_property(monitors, property_types)
+
+
+def set_integer_properties(api, monitors, int_properties):
 
+    api.LocalLB.Monitor.set_template_int_property(template_names=monitors, values=int_properties)
+
+
+def diff_properties(get_properties, api, monitors, properties):
+
+    # return the (monitor, property) pairs whose current value differs
+    pairs = [(m, p) for m, p in zip(monitors, properties) if p['value'] is not None]
+    if not pairs:
+        return []
     try:
-        return str_property == api.LocalLB.Monitor.get_template_string_property([monitor], [str_property['type']])[0]
+        current = get_properties(api, [m for m, p in pairs], [p['type'] for m, p in pairs])
     except bigsuds.OperationFailed, e:
         # happens in check mode if not created yet
         if "was not found" in str(e):
-            return True
+            return []
         else:
             # genuine exception
             raise
-    return True
+    return [(m, p) for (m, p), cur in zip(pairs, current) if p != cur]
+
+
+def update_monitor_properties(api, module, monitor, template_string_properties, template_integer_properties):
+
+    # one read per property type, then one write per type for whatever differs
+    changed = False
+    str_changes = diff_properties(get_string_properties, api,
+                                  [monitor] * len(template_string_properties),
+                                  template_string_properties)
+    int_changes = diff_properties(get_integer_properties, api,
+                                  [monitor] * len(template_integer_properties),
+                                  template_integer_properties)
+    if str_changes:
+        if not module.check_mode:
+            set_string_properties(api, [m for m, p in str_changes], [p for m, p in str_changes])
+        changed = True
+    if int_changes:
+        if not module.check_mode:
+            set_integer_properties(api, [m for m, p in int_changes], [p for m, p in int_changes])
+        changed = True
+
+    return changed
 
 
-def set_string_property(api, monitor, str_property):
+def get_existing_monitors(api, monitors):
 
-    api.LocalLB.Monitor.set_template_string_property(template_names=[monitor], values=[str_property])
+    # one call lists every template; type, parent and destination of the
+    # requested ones that exist are then read with one call each
+    templates = dict([(x['template_name'], x['template_type'])
+                      for x in api.LocalLB.Monitor.get_template_list()])
+    names = [x for x in monitors if x in templates]
+    existing = {}
+    if names:
+        parents = api.LocalLB.Monitor.get_parent_template(template_names=names)
+        destinations = api.LocalLB.Monitor.get_template_destination(template_names=names)
+        for name, parent, ipport in zip(names, parents, destinations):
+            existing[name] = {'type': templates[name], 'parent': parent,
+                              'ipport': ipport}
+    return existing
 
 
-def check_integer_property(api, monitor, int_property):
+def create_monitors(api, definitions):
 
     try:
-        return int_property == api.LocalLB.Monitor.get_template_integer_property([monitor], [int_property['type']])[0]
+        api.LocalLB.Monitor.create_template(
+            templates=[{'template_name': x['name'], 'template_type': x['type']} for x in definitions],
+            template_attributes=[x['template_attributes'] for x in definitions])
     except bigsuds.OperationFailed, e:
-        # happens in check mode if not created yet
-        if "was not found" in str(e):
-            return True
+        if "already exists" in str(e):
+            # another task created some of them; retry one by one
+            for x in definitions:
+                create_monitor(api, x['name'], x['template_attributes'], x['type'])
         else:
             # genuine exception
             raise
-    return True
-
 
-def set_integer_property(api, monitor, int_property):
 
-    api.LocalLB.Monitor.set_template_int_property(template_names=[monitor], values=[int_property])
+def delete_monitors(api, monitors):
 
+    try:
+        api.LocalLB.Monitor.delete_template(template_names=monitors)
+    except bigsuds.OperationFailed, e:
+        # maybe some were deleted since we checked; retry one by one
+        if "was not found" in str(e):
+            for monitor in monitors:
+                delete_monitor(api, monitor)
+        else:
+            # genuine exception
+            raise
 
-def update_monitor_properties(api, module, monitor, template_string_properties, template_integer_properties):
-
-    changed = False
-    for str_property in template_string_properties:
-        if str_property['value'] is not None and not check_string_property(api, monitor, str_property):
-            if not module.check_mode:
-                set_string_property(api, monitor, str_property)
-            changed = True
-    for int_property in template_integer_properties:
-        if int_property['value'] is not None and not check_integer_property(api, monitor, int_property):
-            if not module.check_mode:
-                set_integer_property(api, monitor, int_property)
-            changed = True
 
-    return changed
+def reconcile_monitors(api, module, definitions, existing):
+
+    # converge a list of monitor definitions with at most one call per
+    # action: delete, create, read and write string properties, read and
+    # write integer properties and set destinations
+    report = dict([(x['name'], []) for x in definitions])
+    for x in definitions:
+        current = existing.get(x['name'])
+        if current and (current['type'] != x['type'] or current['parent'] != x['parent']):
+            module.fail_json(msg='Monitor %s already exists, but has a different type (%s) or parent(%s)' % (x['name'], current['type'], current['parent']))
+
+    deleted = [x['name'] for x in definitions if x['state'] == 'absent' and x['name'] in existing]
+    created = [x for x in definitions if x['state'] == 'present' and x['name'] not in existing]
+    updated = [x for x in definitions if x['state'] == 'present' and x['name'] in existing]
+
+    if not module.check_mode:
+        if deleted:
+            delete_monitors(api, deleted)
+        if created:
+            create_monitors(api, created)
+    for monitor in deleted:
+        report[monitor].append('deleted')
+    for x in created:
+        report[x['name']].append('created')
+
+    # properties of monitors not created yet cannot be read in check mode
+    targets = updated
+    if not module.check_mode:
+        targets = updated + created
+    for key, get_properties, set_properties in (
+            ('string_properties', get_string_properties, set_string_properties),
+            ('integer_properties', get_integer_properties, set_integer_properties)):
+        monitors = []
+        properties = []
+        for x in targets:
+            monitors.extend([x['name']] * len(x[key]))
+            properties.extend(x[key])
+        changes = diff_properties(get_properties, api, monitors, properties)
+        if changes and not module.check_mode:
+            set_properties(api, [m for m, p in changes], [p for m, p in changes])
+        for monitor, prop in changes:
+            report[monitor].append(prop['type'])
+
+    moved = [x for x in updated if existing[x['name']]['ipport'] != x['ipport']]
+    if moved and not module.check_mode:
+        api.LocalLB.Monitor.set_template_destination(template_names=[x['name'] for x in moved],
+                                                     destinations=[x['ipport'] for x in moved])
+    for x in moved:
+        report[x['name']].append('destination')
+
+    changed = len([x for x in report.values() if x]) > 0
+    return changed, report
 
 
 def get_ipport(api, monitor):
@@ -322,81 +459,41 @@ def set_ipport(api, monitor, ipport):
 # writing a module for other monitor types should 
 # only need an updated main() (and monitor specific functions)
 
-def main():
+MONITOR_OPTIONS = ('name', 'state', 'partition', 'type', 'parent',
+                   'parent_partition', 'send', 'receive', 'ip', 'port',
+                   'interval', 'timeout', 'time_until_up')
 
-    # begin monitor specific stuff
 
-    module = AnsibleModule(
-        argument_spec = dict(
-            server    = dict(required=True),
-            user      = dict(required=True),
-            password  = dict(required=True),
-            partition = dict(default='Common'),
-            state     = dict(default='present', choices=['present', 'absent']),
-            name      = dict(required=True),
-            type      = dict(default=DEFAULT_TEMPLATE_TYPE_CHOICE, choices=TEMPLATE_TYPE_CHOICES),
-            parent    = dict(default=DEFAULT_PARENT),
-            parent_partition = dict(default='Common'),
-            send      = dict(required=False),
-            receive   = dict(required=False),
-            ip        = dict(required=False),
-            port      = dict(required=False, type='int'),
-            interval  = dict(required=False, type='int'),
-            timeout   = dict(required=False, type='int'),
-            time_until_up = dict(required=False, type='int', default=0)
-        ),
-        supports_check_mode=True
-    )
-
-    server = module.params['server']
-    user = module.params['user']
-    password = module.params['password']
-    partition = module.params['partition']
-    parent_partition = module.params['parent_partition']
-    state = module.params['state']
-    name = module.params['name']
-    type = 'TTYPE_' + module.params['type'].upper()
-    parent = "/%s/%s" % (parent_partition, module.params['parent'])
-    monitor = "/%s/%s" % (partition, name)
-    send = module.params['send']
-    receive = module.params['receive']
-    ip = module.params['ip']
-    port = module.params['port']
-    interval = module.params['interval']
-    timeout = module.params['timeout']
-    time_until_up = module.params['time_until_up']
-
-    # tcp monitor has multiple types, so overrule
-    global TEMPLATE_TYPE
-    TEMPLATE_TYPE = type
-
-    # end monitor specific stuff
-
-    if not bigsuds_found:
-        module.fail_json(msg="the python bigsuds module is required")
-    api = bigip_api(server, user, password)
-    monitor_exists = check_monitor_exists(module, api, monitor, parent)
+def build_monitor(params, cur_ipport=None):
 
+    # monitor specific definition, from module style parameters;
+    # cur_ipport is the destination of an already existing monitor
+    send = params['send']
+    receive = params['receive']
+    ip = params['ip']
+    port = params['port']
+    interval = params['interval']
+    timeout = params['timeout']
+    time_until_up = params['time_until_up']
 
     # ipport is a special setting
-    if monitor_exists: # make sure to not update current settings if not asked
-        cur_ipport = get_ipport(api, monitor)
+    if cur_ipport is not None: # make sure to not update current settings if not asked
         if ip is None:
             ip = cur_ipport['ipport']['address']
         if port is None:
             port = cur_ipport['ipport']['port']
     else: # use API defaults if not defined to create it
-        if interval is None:        
+        if interval is None:
             interval = 5
-        if timeout is None:         
+        if timeout is None:
             timeout = 16
-        if ip is None:              
+        if ip is None:
             ip = '0.0.0.0'
-        if port is None:            
+        if port is None:
             port = 0
-        if send is None:            
+        if send is None:
             send = ''
-        if receive is None:         
+        if receive is None:
             receive = ''
 
     # define and set address type
@@ -413,6 +510,8 @@ def main():
               'ipport': {'address': ip,
                          'port': port}}
 
+    parent = "/%s/%s" % (params['parent_partition'], params['parent'])
+
     template_attributes = {'parent_template': parent,
                            'interval': interval,
                            'timeout': timeout,
@@ -421,7 +520,8 @@ def main():
                            'is_directly_usable': True}
 
     # monitor specific stuff
-    if type == 'TTYPE_TCP':
+    template_type = 'TTYPE_' + params['type'].upper()
+    if template_type == 'TTYPE_TCP':
         template_string_properties = [{'type': 'STYPE_SEND',
                                        'value': send},
                                       {'type': 'STYPE_RECEIVE',
@@ -434,10 +534,122 @@ def main():
                                    {'type': 'ITYPE_TIMEOUT',
                                     'value': timeout},
                                    {'type': 'ITYPE_TIME_UNTIL_UP',
-                                    'value': interval}]
+                                    'value': time_until_up}]
+
+    return {'name': "/%s/%s" % (params['partition'], params['name']),
+            'state': params['state'],
+            'type': template_type,
+            'parent': parent,
+            'ipport': ipport,
+            'template_attributes': template_attributes,
+            'string_properties': template_string_properties,
+            'integer_properties': template_integer_properties}
+
+
+def parse_monitors(module):
+
+    # merge every item of the monitors list over the module parameters
+    monitors = {}
+    for item in module.params['monitors']:
+        if not isinstance(item, dict) or not item.get('name'):
+            module.fail_json(msg="each item of monitors must be a dictionary with a name")
+        unknown = [x for x in item if x not in MONITOR_OPTIONS]
+        if unknown:
+            module.fail_json(msg="unsupported monitor options: %s" % ", ".join(unknown))
+        params = dict([(x, module.params[x]) for x in MONITOR_OPTIONS])
+        params.update(item)
+        if params['state'] not in ('present', 'absent'):
+            module.fail_json(msg="state of monitor %s must be present or absent" % params['name'])
+        if params['type'] not in TEMPLATE_TYPE_CHOICES:
+            module.fail_json(msg="type of monitor %s must be one of %s" % (params['name'], ", ".join(TEMPLATE_TYPE_CHOICES)))
+        for x in ('port', 'interval', 'timeout', 'time_until_up'):
+            if params[x] is not None:
+                try:
+                    params[x] = int(params[x])
+                except ValueError:
+                    module.fail_json(msg="%s of monitor %s must be an integer" % (x, params['name']))
+        monitors["/%s/%s" % (params['partition'], params['name'])] = params
+    return monitors
+
+
+def main():
+
+    # begin monitor specific stuff
+
+    module = AnsibleModule(
+        argument_spec = dict(
+            server    = dict(required=True),
+            user      = dict(required=True),
+            password  = dict(required=True),
+            partition = dict(default='Common'),
+            state     = dict(default='present', choices=['present', 'absent']),
+            name      = dict(required=False),
+            type      = dict(default=DEFAULT_TEMPLATE_TYPE_CHOICE, choices=TEMPLATE_TYPE_CHOICES),
+            parent    = dict(default=DEFAULT_PARENT),
+            parent_partition = dict(default='Common'),
+            send      = dict(required=False),
+            receive   = dict(required=False),
+            ip        = dict(required=False),
+            port      = dict(required=False, type='int'),
+            interval  = dict(required=False, type='int'),
+            timeout   = dict(required=False, type='int'),
+            time_until_up = dict(required=False, type='int', default=0),
+            monitors  = dict(required=False, type='list')
+        ),
+        supports_check_mode=True
+    )
+
+    server = module.params['server']
+    user = module.params['user']
+    password = module.params['password']
+    partition = module.params['partition']
+    parent_partition = module.params['parent_partition']
+    state = module.params['state']
+    name = module.params['name']
+    type = 'TTYPE_' + module.params['type'].upper()
+    parent = "/%s/%s" % (parent_partition, module.params['parent'])
+    monitor = "/%s/%s" % (partition, name)
+
+    if name and module.params['monitors'] is not None:
+        module.fail_json(msg="name and monitors are mutually exclusive")
+    if not name and module.params['monitors'] is None:
+        module.fail_json(msg="one of name or monitors is required")
+
+    # tcp monitor has multiple types, so overrule
+    global TEMPLATE_TYPE
+    TEMPLATE_TYPE = type
+
+    # end monitor specific stuff
+
+    if not bigsuds_found:
+        module.fail_json(msg="the python bigsuds module is required")
+    api = bigip_api(server, user, password)
+
+    if module.params['monitors'] is not None:
+        monitors = parse_monitors(module)
+        try:
+            existing = get_existing_monitors(api, monitors.keys())
+            definitions = [build_monitor(params, existing.get(x, {}).get('ipport'))
+                           for x, params in monitors.items()]
+            changed, report = reconcile_monitors(api, module, definitions, existing)
+        except Exception, e:
+            module.fail_json(msg="received exception: %s" % e)
+        module.exit_json(changed=changed, monitors=report)
+
+    monitor_exists = check_monitor_exists(module, api, monitor, parent)
+
+    cur_ipport = None
+    if monitor_exists:
+        cur_ipport = get_ipport(api, monitor)
+    definition = build_monitor(module.params, cur_ipport)
+    ipport = definition['ipport']
+    template_attributes = definition['template_attributes']
+    template_string_properties = definition['string_properties']
+    template_integer_properties = definition['integer_properties']
 
     # main logic, monitor generic
 
+
     try:
         result = {'changed': False}  # default
 
@@ -70,14 +70,14 @@ options:
         aliases: []
     name:
         description:
-            - "Node name"
+            - "Node name. Required unless I(nodes) is given."
         required: false
         default: null
         choices: []
     host:
         description:
             - "Node IP. Required when state=present and node does not exist. Error when state=absent."
-        required: true
+        required: false
         default: null
         choices: []
         aliases: ['address', 'ip']
@@ -87,6 +87,21 @@ options:
         required: false
         default: null
         choices: []
+    nodes:
+        description:
+            - List of nodes to manage in one run, instead of I(name) and
+              I(host). Each item is either a node address, which is also
+              used as its name, or a dictionary with a C(name) key and
+              optionally C(host) and C(description) keys; a missing
+              C(description) falls back to the module level value. The node
+              list of the partition is read once and all missing or present
+              nodes are created or deleted in a single call, and descriptions
+              are compared and updated with one call each.
+        required: false
+        default: null
+        choices: []
+        aliases: []
+        version_added: "1.9"
 '''
 
 EXAMPLES = '''
@@ -137,6 +152,23 @@ EXAMPLES = '''
       partition=matthite
       name="{{ ansible_default_ipv4["address"] }}"
 
+  - name: Add several nodes at once
+    local_action:
+      module: bigip_node
+      server: lb.mydomain.com
+      user: admin
+      password: mysecret
+      state: present
+      partition: matthite
+      description: "web tier"
+      nodes:
+        - 10.0.0.1
+        - name: web2
+          host: 10.0.0.2
+        - name: web3
+          host: 10.0.0.3
+          description: "canary"
+
 '''
 
 try:
@@ -206,6 +238,160 @@ def set_node_description(api, name, description):
 def get_node_description(api, name):
     return api.LocalLB.NodeAddressV2.get_description(nodes=[name])[0]
 
+def get_node_list(api):
+    return set(api.LocalLB.NodeAddressV2.get_list())
+
+def create_node_addresses(api, addresses, names):
+    # creating in one call fails as a whole if any name or address is
+    # already taken; fall back to one call per node to find out which
+    try:
+        api.LocalLB.NodeAddressV2.create(nodes=names, addresses=addresses,
+                                         limits=[0] * len(names))
+        return (names, [])
+    except bigsuds.OperationFailed, e:
+        if "already exists" not in str(e):
+            # genuine exception
+            raise
+    created = []
+    failed = []
+    for address, name in zip(addresses, names):
+        if create_node_address(api, address, name)[0]:
+            created.append(name)
+        else:
+            failed.append(name)
+    return (created, failed)
+
+def delete_node_addresses(api, names):
+    # deleting in one call fails as a whole if any node is still
+    # referenced by a pool; fall back to one call per node then
+    try:
+        api.LocalLB.NodeAddressV2.delete_node_address(nodes=names)
+        return (names, [])
+    except bigsuds.OperationFailed, e:
+        if "is referenced by a member of pool" not in str(e):
+            # genuine exception
+            raise
+    deleted = []
+    failed = []
+    for name in names:
+        if delete_node_address(api, name)[0]:
+            deleted.append(name)
+        else:
+            failed.append(name)
+    return (deleted, failed)
+
+def get_node_addresses(api, names):
+    return api.LocalLB.NodeAddressV2.get_address(nodes=names)
+
+def set_node_descriptions(api, names, descriptions):
+    api.LocalLB.NodeAddressV2.set_description(nodes=names,
+                                              descriptions=descriptions)
+
+def get_node_descriptions(api, names):
+    return api.LocalLB.NodeAddressV2.get_description(nodes=names)
+
+def parse_nodes(nodes, partition, description):
+    """Return a list of (name, host, description) tuples.
+
+    Raises ValueError for items without a name. Later items for the same
+    node replace earlier ones.
+    """
+    result = []
+    index = {}
+    for item in nodes:
+        if isinstance(item, dict):
+            name = item.get('name')
+            host = item.get('host', item.get('address', item.get('ip')))
+            desc = item.get('description', description)
+        else:
+            name = item
+            host = item
+            desc = description
+        if not name:
+            raise ValueError("invalid node %s" % item)
+        name = str(name)
+        if host is not None and str(host).startswith('/'):
+            host = None
+        if not name.startswith('/'):
+            name = "/%s/%s" % (partition, name)
+        if name in index:
+            result[index[name]] = (name, host, desc)
+        else:
+            index[name] = len(result)
+            result.append((name, host, desc))
+    return result
+
+def reconcile_nodes(api, state, nodes, check_mode):
+    """Create, delete or update a list of nodes with one call per action.
+
+    Returns a result dictionary and a list of error messages for nodes
+    that could not be created or deleted.
+    """
+    current = get_node_list(api)
+    result = {'changed': False}
+    errors = []
+    if state == 'absent':
+        removed = [name for name, host, desc in nodes if name in current]
+        deleted = removed
+        if removed and not check_mode:
+            deleted, failed = delete_node_addresses(api, removed)
+            if failed:
+                errors.append("unable to delete: node referenced by pool: %s"
+                              % ", ".join(failed))
+        result['changed'] = bool(deleted)
+        result['deleted'] = deleted
+        return (result, errors)
+
+    added = [x for x in nodes if x[0] not in current]
+    existing = [x for x in nodes if x[0] in current]
+    missing = [name for name, host, desc in added if host is None]
+    if missing:
+        errors.append("host parameter required when node does not exist: %s"
+                      % ", ".join(missing))
+        return (result, errors)
+
+    created = [name for name, host, desc in added]
+    if added and not check_mode:
+        created, failed = create_node_addresses(
+            api, [host for name, host, desc in added], created)
+        if failed:
+            errors.append("unable to create: referenced name or IP "
+                          "already in use: %s" % ", ".join(failed))
+        new = set(created)
+        described = [(name, desc) for name, host, desc in added
+                     if name in new and desc is not None]
+        if described:
+            set_node_descriptions(api, [x[0] for x in described],
+                                  [x[1] for x in described])
+    result['created'] = created
+    result['changed'] = bool(created)
+
+    checked = [x for x in existing if x[1] is not None]
+    if checked:
+        addresses = get_node_addresses(api, [x[0] for x in checked])
+        moved = [name for (name, host, desc), address in zip(checked, addresses)
+                 if address != host]
+        if moved:
+            errors.append("Changing the node address is not supported by "
+                          "the API; delete and recreate the node: %s"
+                          % ", ".join(moved))
+            return (result, errors)
+
+    described = [(name, desc) for name, host, desc in existing
+                 if desc is not None]
+    updated = []
+    if described:
+        descriptions = get_node_descriptions(api, [x[0] for x in described])
+        updated = [x for x, current_desc in zip(described, descriptions)
+                   if current_desc != x[1]]
+        if updated and not check_mode:
+            set_node_descriptions(api, [x[0] for x in updated],
+                                  [x[1] for x in updated])
+    result['updated'] = [x[0] for x in updated]
+    if updated:
+        result['changed'] = True
+    return (result, errors)
+
 def main():
     module = AnsibleModule(
         argument_spec = dict(
@@ -214,9 +400,10 @@ def main():
             password = dict(type='str', required=True),
             state = dict(type='str', default='present', choices=['present', 'absent']),
             partition = dict(type='str', default='Common'),
-            name = dict(type='str', required=True),
+            name = dict(type='str'),
             host = dict(type='str', aliases=['address', 'ip']),
-            description = dict(type='str')
+            description = dict(type='str'),
+            nodes = dict(type='list')
         ),
         supports_check_mode=True
     )
@@ -233,15 +420,31 @@ def main():
     name = module.params['name']
     address = "/%s/%s" % (partition, name)
     description = module.params['description']
+    nodes = module.params['nodes']
 
     if state == 'absent' and host is not None:
         module.fail_json(msg="host parameter invalid when state=absent")
 
+    if nodes is not None:
+        if name or host:
+            module.fail_json(msg="nodes cannot be combined with name and host")
+        try:
+            nodes = parse_nodes(nodes, partition, description)
+        except ValueError, e:
+            module.fail_json(msg=str(e))
+    elif not name:
+        module.fail_json(msg="name parameter required unless nodes is given")
+
     try:
         api = bigip_api(server, user, password)
         result = {'changed': False}  # default
 
-        if state == 'absent':
+        if nodes is not None:
+            result, errors = reconcile_nodes(api, state, nodes, module.check_mode)
+            if errors:
+                module.fail_json(msg="; ".join(errors), **result)
+
+        elif state == 'absent':
             if node_exists(api, address):
                 if not module.check_mode:
                     deleted, desc = delete_node_address(api, address)
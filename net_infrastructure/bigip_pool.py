@@ -146,6 +146,19 @@ options:
         default: null
         choices: []
         aliases: []
+    members:
+        description:
+            - "Complete list of pool members, each either a C(host:port)
+              string or a dictionary with C(host) and C(port) keys. With
+              state=present the pool members are made to match this list,
+              adding missing and removing extra members with one call each.
+              With state=absent the listed members are removed from the pool.
+              Cannot be combined with host and port."
+        version_added: "1.9"
+        required: False
+        default: null
+        choices: []
+        aliases: []
 '''
 
 EXAMPLES = '''
@@ -208,6 +221,21 @@ EXAMPLES = '''
 
 - hosts: localhost
   tasks:
+  - name: Set the members of a pool
+    local_action:
+      module: bigip_pool
+      server: lb.mydomain.com
+      user: admin
+      password: mysecret
+      state: present
+      name: matthite-pool
+      partition: matthite
+      members:
+        - 10.0.0.1:80
+        - 10.0.0.2:80
+        - host: 10.0.0.3
+          port: 8080
+
   - name: Delete pool
     local_action: >
       bigip_pool
@@ -249,14 +277,14 @@ def pool_exists(api, pool):
             raise
     return result
 
-def create_pool(api, pool, lb_method):
+def create_pool(api, pool, lb_method, members=None):
     # create requires lb_method but we don't want to default
     # to a value on subsequent runs
     if not lb_method:
         lb_method = 'round_robin'
     lb_method = "LB_METHOD_%s" % lb_method.strip().upper()
     api.LocalLB.Pool.create_v2(pool_names=[pool], lb_methods=[lb_method],
-                               members=[[]])
+                               members=[to_member_list(members or [])])
 
 def remove_pool(api, pool):
     api.LocalLB.Pool.delete_pool(pool_names=[pool])
@@ -336,6 +364,86 @@ def add_pool_member(api, pool, address, port):
     members = [{'address': address, 'port': port}]
     api.LocalLB.Pool.add_member_v2(pool_names=[pool], members=[members])
 
+def get_pool_members(api, pool):
+    members = api.LocalLB.Pool.get_member_v2(pool_names=[pool])[0]
+    return set([(x['address'], x['port']) for x in members])
+
+def to_member_list(members):
+    return [{'address': address, 'port': port} for address, port in members]
+
+def add_pool_members(api, pool, members):
+    api.LocalLB.Pool.add_member_v2(pool_names=[pool], members=[to_member_list(members)])
+
+def remove_pool_members(api, pool, members):
+    api.LocalLB.Pool.remove_member_v2(pool_names=[pool], members=[to_member_list(members)])
+
+def delete_node_addresses(api, addresses):
+    # deleting in one call fails as a whole if any node is still
+    # referenced by another pool; fall back to one call per node then
+    try:
+        api.LocalLB.NodeAddressV2.delete_node_address(nodes=addresses)
+        return addresses
+    except bigsuds.OperationFailed, e:
+        if "is referenced by a member of pool" not in str(e):
+            # genuine exception
+            raise
+    return [x for x in addresses if delete_node_address(api, x)]
+
+def parse_members(members, partition):
+    """Return a list of unique (address, port) tuples.
+
+    Raises ValueError for items without a valid host and port.
+    """
+    result = []
+    for item in members:
+        if isinstance(item, dict):
+            host = item.get('host', item.get('address'))
+            port = item.get('port')
+        else:
+            host, sep, port = str(item).rpartition(':')
+        try:
+            port = int(port)
+        except (TypeError, ValueError):
+            raise ValueError("invalid port in member %s" % item)
+        if not host or not 0 < port < 65536:
+            raise ValueError("invalid member %s" % item)
+        if not host.startswith('/'):
+            host = "/%s/%s" % (partition, host)
+        if (host, port) not in result:
+            result.append((host, port))
+    return result
+
+def reconcile_members(api, pool, members, check_mode, purge=True):
+    """Add missing and, if purge is set, remove extra pool members."""
+    current = get_pool_members(api, pool)
+    added = [x for x in members if x not in current]
+    removed = []
+    if purge:
+        removed = sorted(current.difference(members))
+    result = {'changed': bool(added or removed),
+              'added': ["%s:%s" % x for x in added],
+              'removed': ["%s:%s" % x for x in removed]}
+    if not check_mode:
+        if removed:
+            remove_pool_members(api, pool, removed)
+        if added:
+            add_pool_members(api, pool, added)
+        if removed:
+            addresses = sorted(set([x[0] for x in removed]).difference(
+                [x[0] for x in members]))
+            if addresses:
+                result['deleted'] = delete_node_addresses(api, addresses)
+    return result
+
+def remove_listed_members(api, pool, members, check_mode):
+    current = get_pool_members(api, pool)
+    removed = [x for x in members if x in current]
+    result = {'changed': bool(removed), 'removed': ["%s:%s" % x for x in removed]}
+    if removed and not check_mode:
+        remove_pool_members(api, pool, removed)
+        result['deleted'] = delete_node_addresses(api, sorted(set([x[0] for x in removed])))
+    return result
+
 def main():
     lb_method_choices = ['round_robin', 'ratio_member',
                          'least_connection_member', 'observed_member',
@@ -369,7 +477,8 @@ def main():
             slow_ramp_time = dict(type='int'),
             service_down_action = dict(type='str', choices=service_down_choices),
             host = dict(type='str', aliases=['address']),
-            port = dict(type='int')
+            port = dict(type='int'),
+            members = dict(type='list')
         ),
         supports_check_mode=True
     )
@@ -406,9 +515,18 @@ def main():
     host = module.params['host']
     address = "/%s/%s" % (partition, host)
     port = module.params['port']
+    members = module.params['members']
 
     # sanity check user supplied values
 
+    if members is not None:
+        if host or port:
+            module.fail_json(msg="members cannot be combined with host and port")
+        try:
+            members = parse_members(members, partition)
+        except ValueError, e:
+            module.fail_json(msg=str(e))
+
     if (host and not port) or (port and not host):
         module.fail_json(msg="both host and port must be supplied")
 
@@ -439,7 +557,11 @@ def main():
         result = {'changed': False}  # default
 
         if state == 'absent':
-            if host and port and pool:
+            if members is not None:
+                # member removal takes precedent
+                if pool_exists(api, pool):
+                    result = remove_listed_members(api, pool, members, module.check_mode)
+            elif host and port and pool:
                 # member removal takes precedent
                 if pool_exists(api, pool) and member_exists(api, pool, address, port):
                     if not module.check_mode:
@@ -477,7 +599,7 @@ def main():
                     # this catches the exception and does something smart
                     # about it!
                     try:
-                        create_pool(api, pool, lb_method)
+                        create_pool(api, pool, lb_method, members)
                         result = {'changed': True}
                     except bigsuds.OperationFailed, e:
                         if "already exists" in str(e):
@@ -524,6 +646,10 @@ def main():
                     if not module.check_mode:
                         add_pool_member(api, pool, address, port)
                     result = {'changed': True}
+                if members is not None:
+                    member_result = reconcile_members(api, pool, members, module.check_mode)
+                    if member_result['changed']:
+                        result.update(member_result)
 
     except Exception, e:
         module.fail_json(msg="received exception: %s" % e)
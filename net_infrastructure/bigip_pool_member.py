@@ -79,18 +79,32 @@ options:
         aliases: []
     host:
         description:
-            - Pool member IP
-        required: true
+            - Pool member IP. Required unless I(members) is used.
+        required: false
         default: null
         choices: []
         aliases: ['address', 'name']
     port:
         description:
-            - Pool member port
-        required: true
+            - Pool member port. Required unless I(members) is used.
+        required: false
+        default: null
+        choices: []
+        aliases: []
+    members:
+        description:
+            - List of pool members to manage in one run, instead of I(host)
+              and I(port). Each item is either a C(host:port) string or a
+              dictionary with C(host) and C(port) keys and optionally any of
+              C(connection_limit), C(description), C(rate_limit) and C(ratio),
+              which override the module level values for that member. The
+              current members of the pool are read once and all missing or
+              present members are added or removed in a single call.
+        required: false
         default: null
         choices: []
         aliases: []
+        version_added: "1.9"
     connection_limit:
         description:
             - Pool member connection limit. Setting this to 0 disables the limit.
@@ -172,6 +186,25 @@ EXAMPLES = '''
       host="{{ ansible_default_ipv4["address"] }}"
       port=80
 
+  - name: Add all web servers to the pool in one run
+    local_action:
+      module: bigip_pool_member
+      server: lb.mydomain.com
+      user: admin
+      password: mysecret
+      state: present
+      pool: matthite-pool
+      partition: matthite
+      ratio: 1
+      members:
+        - 10.0.0.1:80
+        - 10.0.0.2:80
+        - host: 10.0.0.3
+          port: 80
+          ratio: 2
+          description: "canary"
+    run_once: true
+
 '''
 
 try:
@@ -232,6 +265,31 @@ def delete_node_address(api, address):
             raise
     return result
 
+def get_pool_members(api, pool):
+    members = api.LocalLB.Pool.get_member_v2(pool_names=[pool])[0]
+    return set([(x['address'], x['port']) for x in members])
+
+def to_member_list(members):
+    return [{'address': address, 'port': port} for address, port in members]
+
+def add_pool_members(api, pool, members):
+    api.LocalLB.Pool.add_member_v2(pool_names=[pool], members=[to_member_list(members)])
+
+def remove_pool_members(api, pool, members):
+    api.LocalLB.Pool.remove_member_v2(pool_names=[pool], members=[to_member_list(members)])
+
+def delete_node_addresses(api, addresses):
+    # deleting in one call fails as a whole if any node is still
+    # referenced by another pool; fall back to one call per node then
+    try:
+        api.LocalLB.NodeAddressV2.delete_node_address(nodes=addresses)
+        return addresses
+    except bigsuds.OperationFailed, e:
+        if "is referenced by a member of pool" not in str(e):
+            # genuine exception
+            raise
+    return [x for x in addresses if delete_node_address(api, x)]
+
 def remove_pool_member(api, pool, address, port):
     members = [{'address': address, 'port': port}]
     api.LocalLB.Pool.remove_member_v2(pool_names=[pool], members=[members])
@@ -240,42 +298,121 @@ def add_pool_member(api, pool, address, port):
     members = [{'address': address, 'port': port}]
     api.LocalLB.Pool.add_member_v2(pool_names=[pool], members=[members])
 
-def get_connection_limit(api, pool, address, port):
-    members = [{'address': address, 'port': port}]
-    result = api.LocalLB.Pool.get_member_connection_limit(pool_names=[pool], members=[members])[0][0]
-    return result
-
-def set_connection_limit(api, pool, address, port, limit):
-    members = [{'address': address, 'port': port}]
-    api.LocalLB.Pool.set_member_connection_limit(pool_names=[pool], members=[members], limits=[[limit]])
-
-def get_description(api, pool, address, port):
-    members = [{'address': address, 'port': port}]
-    result = api.LocalLB.Pool.get_member_description(pool_names=[pool], members=[members])[0][0]
+def get_member_attribute(api, pool, attribute, members):
+    result = getattr(api.LocalLB.Pool, 'get_member_' + attribute)(pool_names=[pool], members=[to_member_list(members)])[0]
     return result
 
-def set_description(api, pool, address, port, description):
-    members = [{'address': address, 'port': port}]
-    api.LocalLB.Pool.set_member_description(pool_names=[pool], members=[members], descriptions=[[description]])
-
-def get_rate_limit(api, pool, address, port):
-    members = [{'address': address, 'port': port}]
-    result = api.LocalLB.Pool.get_member_rate_limit(pool_names=[pool], members=[members])[0][0]
+def set_member_attribute(api, pool, attribute, members, values):
+    # maps each attribute to the argument name of its set_member_* call
+    value_args = {'connection_limit': 'limits', 'description': 'descriptions',
+                  'rate_limit': 'limits', 'ratio': 'ratios'}
+    kwargs = {'pool_names': [pool], 'members': [to_member_list(members)],
+              value_args[attribute]: [values]}
+    getattr(api.LocalLB.Pool, 'set_member_' + attribute)(**kwargs)
+
+def set_new_member_attributes(api, pool, members):
+    # one call per attribute for all members that specify it
+    for attribute in ('connection_limit', 'description', 'rate_limit', 'ratio'):
+        targets = [(x, attributes[attribute]) for x, attributes in members
+                   if attributes[attribute] is not None]
+        if targets:
+            set_member_attribute(api, pool, attribute,
+                                 [x for x, value in targets],
+                                 [value for x, value in targets])
+
+def reconcile_attributes(api, pool, members, check_mode):
+    """Bring the attributes of existing members in line with the request.
+
+    Each attribute is read for all members that specify it in one call,
+    and only the members whose value differs are written back, again in
+    one call per attribute. Returns a dict mapping each updated member
+    to the list of attributes that changed.
+    """
+    updated = {}
+    for attribute in ('connection_limit', 'description', 'rate_limit', 'ratio'):
+        wanted = [(x, attributes[attribute]) for x, attributes in members
+                  if attributes[attribute] is not None]
+        if not wanted:
+            continue
+        current = get_member_attribute(api, pool, attribute, [x for x, value in wanted])
+        differ = [(x, value) for (x, value), actual in zip(wanted, current)
+                  if value != actual]
+        if not differ:
+            continue
+        if not check_mode:
+            set_member_attribute(api, pool, attribute,
+                                 [x for x, value in differ],
+                                 [value for x, value in differ])
+        for x, value in differ:
+            updated.setdefault("%s:%s" % x, []).append(attribute)
+    return updated
+
+def parse_members(members, partition, defaults):
+    """Return a list of ((address, port), attributes) tuples.
+
+    Raises ValueError for items without a valid host and port. Later
+    items for the same member replace earlier ones.
+    """
+    result = []
+    index = {}
+    for item in members:
+        if isinstance(item, dict):
+            attributes = dict(defaults)
+            host = item.get('host', item.get('address', item.get('name')))
+            port = item.get('port')
+            for key in defaults:
+                if item.get(key) is not None:
+                    attributes[key] = item[key]
+        else:
+            attributes = dict(defaults)
+            host, sep, port = str(item).rpartition(':')
+        try:
+            port = int(port)
+        except (TypeError, ValueError):
+            raise ValueError("invalid port in member %s" % item)
+        if not host or not 0 < port < 65536:
+            raise ValueError("invalid member %s" % item)
+        if not host.startswith('/'):
+            host = "/%s/%s" % (partition, host)
+        for key in ('connection_limit', 'rate_limit', 'ratio'):
+            if attributes[key] is not None:
+                attributes[key] = int(attributes[key])
+        if (host, port) in index:
+            result[index[(host, port)]] = ((host, port), attributes)
+        else:
+            index[(host, port)] = len(result)
+            result.append(((host, port), attributes))
     return result
 
-def set_rate_limit(api, pool, address, port, limit):
-    members = [{'address': address, 'port': port}]
-    api.LocalLB.Pool.set_member_rate_limit(pool_names=[pool], members=[members], limits=[[limit]])
-
-def get_ratio(api, pool, address, port):
-    members = [{'address': address, 'port': port}]
-    result = api.LocalLB.Pool.get_member_ratio(pool_names=[pool], members=[members])[0][0]
+def reconcile_members(api, pool, state, members, check_mode):
+    """Add or remove a list of pool members with one call per action."""
+    current = get_pool_members(api, pool)
+    result = {'changed': False}
+    if state == 'absent':
+        removed = [x for x, attributes in members if x in current]
+        if removed:
+            if not check_mode:
+                remove_pool_members(api, pool, removed)
+                addresses = sorted(set([x[0] for x in removed]))
+                result['deleted'] = delete_node_addresses(api, addresses)
+            result['changed'] = True
+        result['removed'] = ["%s:%s" % x for x in removed]
+        return result
+
+    added = [(x, attributes) for x, attributes in members if x not in current]
+    existing = [(x, attributes) for x, attributes in members if x in current]
+    if added:
+        if not check_mode:
+            add_pool_members(api, pool, [x for x, attributes in added])
+            set_new_member_attributes(api, pool, added)
+        result['changed'] = True
+    result['added'] = ["%s:%s" % x for x, attributes in added]
+    if existing:
+        result['updated'] = reconcile_attributes(api, pool, existing, check_mode)
+        if result['updated']:
+            result['changed'] = True
     return result
 
-def set_ratio(api, pool, address, port, ratio):
-    members = [{'address': address, 'port': port}]
-    api.LocalLB.Pool.set_member_ratio(pool_names=[pool], members=[members], ratios=[[ratio]])
-
 def main():
     module = AnsibleModule(
         argument_spec = dict(
@@ -285,8 +422,9 @@ def main():
             state = dict(type='str', default='present', choices=['present', 'absent']),
             pool = dict(type='str', required=True),
             partition = dict(type='str', default='Common'),
-            host = dict(type='str', required=True, aliases=['address', 'name']),
-            port = dict(type='int', required=True),
+            host = dict(type='str', aliases=['address', 'name']),
+            port = dict(type='int'),
+            members = dict(type='list'),
             connection_limit = dict(type='int'),
             description = dict(type='str'),
             rate_limit = dict(type='int'),
@@ -311,14 +449,26 @@ def main():
     host = module.params['host']
     address = "/%s/%s" % (partition, host)
     port = module.params['port']
+    members = module.params['members']
 
     # sanity check user supplied values
 
-    if (host and not port) or (port and not host):
-        module.fail_json(msg="both host and port must be supplied")
-
-    if 1 > port > 65535:
-        module.fail_json(msg="valid ports must be in range 1 - 65535")
+    if members is not None:
+        if host or port:
+            module.fail_json(msg="members cannot be combined with host and port")
+        defaults = {'connection_limit': connection_limit,
+                    'description': description,
+                    'rate_limit': rate_limit, 'ratio': ratio}
+        try:
+            members = parse_members(members, partition, defaults)
+        except ValueError, e:
+            module.fail_json(msg=str(e))
+    else:
+        if not host or not port:
+            module.fail_json(msg="both host and port must be supplied")
+
+        if 1 > port > 65535:
+            module.fail_json(msg="valid ports must be in range 1 - 65535")
 
     try:
         api = bigip_api(server, user, password)
@@ -326,7 +476,10 @@ def main():
             module.fail_json(msg="pool %s does not exist" % pool)
         result = {'changed': False}  # default
 
-        if state == 'absent':
+        if members is not None:
+            result = reconcile_members(api, pool, state, members, module.check_mode)
+
+        elif state == 'absent':
             if member_exists(api, pool, address, port):
                 if not module.check_mode:
                     remove_pool_member(api, pool, address, port)
@@ -336,35 +489,18 @@ def main():
                     result = {'changed': True}
 
         elif state == 'present':
+            member = [((address, port), {'connection_limit': connection_limit,
+                                         'description': description,
+                                         'rate_limit': rate_limit,
+                                         'ratio': ratio})]
             if not member_exists(api, pool, address, port):
                 if not module.check_mode:
                     add_pool_member(api, pool, address, port)
-                    if connection_limit is not None:
-                        set_connection_limit(api, pool, address, port, connection_limit)
-                    if description is not None:
-                        set_description(api, pool, address, port, description)
-                    if rate_limit is not None:
-                        set_rate_limit(api, pool, address, port, rate_limit)
-                    if ratio is not None:
-                        set_ratio(api, pool, address, port, ratio)
+                    set_new_member_attributes(api, pool, member)
                 result = {'changed': True}
             else:
                 # pool member exists -- potentially modify attributes
-                if connection_limit is not None and connection_limit != get_connection_limit(api, pool, address, port):
-                    if not module.check_mode:
-                        set_connection_limit(api, pool, address, port, connection_limit)
-                    result = {'changed': True}
-                if description is not None and description != get_description(api, pool, address, port):
-                    if not module.check_mode:
-                        set_description(api, pool, address, port, description)
-                    result = {'changed': True}
-                if rate_limit is not None and rate_limit != get_rate_limit(api, pool, address, port):
-                    if not module.check_mode:
-                        set_rate_limit(api, pool, address, port, rate_limit)
-                    result = {'changed': True}
-                if ratio is not None and ratio != get_ratio(api, pool, address, port):
-                    if not module.check_mode:
-                        set_ratio(api, pool, address, port, ratio)
+                if reconcile_attributes(api, pool, member, module.check_mode):
                     result = {'changed': True}
 
     except Exception, e:
@@ -80,6 +80,36 @@ options:
     required: false
     default: 'yes'
     choices: ['yes', 'no']
+  drain_timeout:
+    description:
+      - with I(action=disable), wait up to this many seconds for the current client
+        connections of each entity to drop to I(drain_threshold) before returning,
+        and fail if they do not. The connections of a server are those of the
+        services and service group members bound to it; a server with neither
+        cannot be watched and fails the task. Each poll takes one request for
+        all services plus one per service group with members on the servers,
+        waiting longer between polls while connections do not drop. C(0) does not wait.
+        A value above C(0) fails with I(action=enable).
+    required: false
+    default: 0
+    aliases: []
+    version_added: "1.9"
+  drain_threshold:
+    description:
+      - number of current client connections at or below which an entity counts as drained
+    required: false
+    default: 0
+    aliases: []
+    version_added: "1.9"
+  names:
+    description:
+      - list of entity names to act on in a single bulk request, instead of I(name).
+        All entities must be of the same I(type). Entities that fail do not stop
+        the others and are listed in C(errors).
+    required: false
+    default: null
+    aliases: []
+    version_added: "1.9"
 
 requirements: [ "urllib", "urllib2" ]
 author: Nandor Sivok
@@ -94,12 +124,31 @@ ansible host -m netscaler -a "nsc_host=nsc.example.com user=apiuser password=api
 
 # Disable the service local:8080
 ansible host -m netscaler -a "nsc_host=nsc.example.com user=apiuser password=apipass name=local:8080 type=service action=disable"
+
+# Disable a whole tier of servers with one request
+- local_action:
+    module: netscaler
+    nsc_host: nsc.example.com
+    user: apiuser
+    password: apipass
+    action: disable
+    names: "{{ groups['webservers'] }}"
+
+# Disable a server and wait up to 5 minutes for its connections to drain
+ansible host -m netscaler -a "nsc_host=nsc.example.com user=apiuser password=apipass action=disable drain_timeout=300"
 '''
 
 
 import json
 import base64
+import httplib
 import socket
+import ssl
+import time
+
+# bounds of the adaptive wait between two connection polls, in seconds
+DRAIN_MIN_INTERVAL = 1
+DRAIN_MAX_INTERVAL = 30
 
 
 class netscaler(object):
@@ -108,24 +157,102 @@ class netscaler(object):
 
     def __init__(self, module):
         self.module = module
+        self._connection = None
+        self._session = None
+
+    def keepalive(self):
+        # without SSL contexts httplib cannot validate certificates, so
+        # leave those requests to fetch_url
+        return (self._nsc_protocol != 'https'
+                or hasattr(ssl, 'create_default_context')
+                or not self.module.params.get('validate_certs'))
+
+    def connect(self):
+        if self._nsc_protocol != 'https':
+            return httplib.HTTPConnection(self._nsc_host)
+        if not hasattr(ssl, 'create_default_context'):
+            return httplib.HTTPSConnection(self._nsc_host)
+        if self.module.params.get('validate_certs'):
+            context = ssl.create_default_context()
+        else:
+            context = ssl._create_unverified_context()
+        return httplib.HTTPSConnection(self._nsc_host, context=context)
+
+    def send(self, path, data, headers):
+        # reuse one HTTP/1.1 connection for all requests, reconnecting
+        # once if the appliance closed it in between
+        method = data is None and 'GET' or 'POST'
+        while True:
+            fresh = self._connection is None
+            if fresh:
+                self._connection = self.connect()
+            try:
+                self._connection.request(method, path, data, headers)
+                body = self._connection.getresponse().read()
+            except (httplib.HTTPException, socket.error):
+                self._connection.close()
+                self._connection = None
+                if fresh:
+                    raise
+                continue
+            if not body:
+                return {'errorcode': 0}
+            return json.loads(body)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
 
     def http_request(self, api_endpoint, data_json={}):
-        request_url = self._nsc_protocol + '://' + self._nsc_host + self._nitro_base_url + api_endpoint
+        request_path = self._nitro_base_url + api_endpoint
+        request_url = self._nsc_protocol + '://' + self._nsc_host + request_path
 
-        data_json = urllib.urlencode(data_json)
+        data_json = urllib.urlencode(dict((k, json.dumps(v)) for k, v in data_json.items()))
         if not len(data_json):
             data_json = None
 
-        auth = base64.encodestring('%s:%s' % (self._nsc_user, self._nsc_pass)).replace('\n', '').strip()
         headers = {
-            'Authorization': 'Basic %s' % auth,
             'Content-Type' : 'application/x-www-form-urlencoded',
         }
+        if self._session is not None:
+            headers['Cookie'] = 'NITRO_AUTH_TOKEN=%s' % self._session
+        else:
+            auth = base64.encodestring('%s:%s' % (self._nsc_user, self._nsc_pass)).replace('\n', '').strip()
+            headers['Authorization'] = 'Basic %s' % auth
+
+        if self.keepalive():
+            return self.send(request_path, data_json, headers)
 
         response, info = fetch_url(self.module, request_url, data=data_json, headers=headers)
 
         return json.load(response)
 
+    def login(self):
+        resp = self.http_request(
+            'config',
+            {
+                "object":
+                {
+                    "login": {"username": self._nsc_user, "password": self._nsc_pass}
+                }
+            }
+        )
+        if resp['errorcode'] != 0:
+            raise Exception("login failed: %s" % resp.get('message'))
+        self._session = resp['sessionid']
+
+    def logout(self):
+        # the appliance expires abandoned sessions, so a failed logout
+        # must not fail an otherwise successful run
+        if self._session is not None:
+            try:
+                self.http_request('config', {"object": {"logout": {}}})
+            except (httplib.HTTPException, socket.error, ValueError):
+                pass
+            self._session = None
+        self.close()
+
     def prepare_request(self, action):
         resp = self.http_request(
             'config',
@@ -140,6 +267,122 @@ class netscaler(object):
 
         return resp
 
+    def bulk_request(self, action, names):
+        # one request for all entities; with onerror=continue the
+        # appliance reports the outcome of each entity in "response"
+        resp = self.http_request(
+            'config',
+            {
+                "object":
+                {
+                    "params": {"action": action, "onerror": "continue"},
+                    self._type: [{"name": name} for name in names]
+                }
+            }
+        )
+
+        if isinstance(resp.get('response'), list):
+            resp['errors'] = dict((name, r.get('message'))
+                                  for name, r in zip(names, resp['response'])
+                                  if r.get('errorcode'))
+        return resp
+
+    def get_servers(self, names):
+        """Return the bindings of the given servers as a tuple of two
+        dictionaries: one mapping each bound service to its server, and
+        one mapping each service group with members on them to a
+        dictionary of member (ip, port) to server."""
+        names = set(names)
+        resp = self.http_request('config/service?attrs=name,servername')
+        if resp['errorcode'] != 0:
+            raise Exception("unable to list services: %s" % resp.get('message'))
+        services = dict((x['name'], x['servername']) for x in resp.get('service', [])
+                        if x.get('servername') in names)
+        resp = self.http_request('config/servicegroup_servicegroupmember_binding?bulkbindings=yes')
+        if resp['errorcode'] != 0:
+            raise Exception("unable to list service group members: %s" % resp.get('message'))
+        groups = {}
+        for x in resp.get('servicegroup_servicegroupmember_binding', []):
+            if x.get('servername') in names:
+                members = groups.setdefault(x['servicegroupname'], {})
+                members[(x.get('ip'), int(x.get('port', 0)))] = x['servername']
+        return services, groups
+
+    def get_connections(self, names, servers=None):
+        """Return the current client connections of each of the given
+        entities that has any bound service, summing up the services and
+        service group members of a server. Service statistics take one
+        request, and each service group with members on the servers one
+        more."""
+        resp = self.http_request('stat/service')
+        if resp['errorcode'] != 0:
+            raise Exception("unable to read service statistics: %s" % resp.get('message'))
+        names = set(names)
+        result = {}
+        services, groups = servers or (None, {})
+        for stats in resp.get('service', []):
+            if services is not None:
+                name = services.get(stats['name'])
+            else:
+                name = stats['name']
+            if name in names:
+                result[name] = result.get(name, 0) + int(stats.get('curclntconnections', 0))
+        for group, members in groups.items():
+            resp = self.http_request('stat/servicegroup/%s?statbindings=yes' % urllib.quote(group, ''))
+            if resp['errorcode'] != 0:
+                raise Exception("unable to read statistics of service group %s: %s" % (group, resp.get('message')))
+            for sg in resp.get('servicegroup', []):
+                for stats in sg.get('servicegroupmember', []):
+                    key = (stats.get('primaryipaddress'), int(stats.get('primaryport', 0)))
+                    name = members.get(key)
+                    if name is not None:
+                        result[name] = result.get(name, 0) + int(stats.get('curclntconnections', 0))
+        return result
+
+
+def wait_for_drain(n, names, threshold, timeout):
+    """Poll the connections of the given entities until all of them are at
+    or below threshold or timeout seconds have passed.
+
+    The wait between polls follows the observed drain rate, and doubles
+    while the connections do not drop. Entities without any bound service
+    have no connections to watch; they are reported as unbound and never
+    count as drained.
+    """
+    servers = None
+    if n._type == 'server':
+        servers = n.get_servers(names)
+    started = time.time()
+    deadline = started + timeout
+    interval = DRAIN_MIN_INTERVAL
+    previous = None
+    polls = 0
+    while True:
+        connections = n.get_connections(names, servers)
+        polls += 1
+        unbound = [x for x in names if x not in connections]
+        busy = dict((k, v) for k, v in connections.items() if v > threshold)
+        now = time.time()
+        if not busy or now >= deadline:
+            break
+        total = sum(busy.values())
+        if previous is not None and total < previous[1]:
+            # expect the connections to keep dropping at the same rate
+            rate = (previous[1] - total) / max(now - previous[0], 0.001)
+            interval = (total - threshold * len(busy)) / rate
+        else:
+            interval *= 2
+        interval = min(max(interval, DRAIN_MIN_INTERVAL), DRAIN_MAX_INTERVAL)
+        previous = (now, total)
+        time.sleep(min(interval, deadline - now))
+    return {
+        'drained': not busy and not unbound,
+        'connections': connections,
+        'unbound': unbound,
+        'polls': polls,
+        'elapsed': time.time() - started,
+    }
+
 
 def core(module):
     n = netscaler(module)
@@ -150,8 +393,23 @@ def core(module):
     n._name = module.params.get('name')
     n._type = module.params.get('type')
     action = module.params.get('action')
+    names = module.params.get('names')
 
-    r = n.prepare_request(action)
+    n.login()
+    try:
+        if names:
+            # drop duplicates but keep the order
+            seen = set()
+            names = [x for x in names if not (x in seen or seen.add(x))]
+            r = n.bulk_request(action, names)
+        else:
+            r = n.prepare_request(action)
+            names = [n._name]
+        timeout = module.params.get('drain_timeout')
+        if action == 'disable' and timeout > 0 and r['errorcode'] == 0:
+            r['drain'] = wait_for_drain(n, names, module.params.get('drain_threshold'), timeout)
+    finally:
+        n.logout()
 
     return r['errorcode'], r
 
@@ -168,9 +426,15 @@ def main():
             name = dict(default=socket.gethostname()),
             type = dict(default='server', choices=['service', 'server']),
             validate_certs=dict(default='yes', type='bool'),
+            names = dict(type='list'),
+            drain_timeout = dict(default=0, type='int'),
+            drain_threshold = dict(default=0, type='int'),
         )
     )
 
+    if module.params['drain_timeout'] > 0 and module.params['action'] != 'disable':
+        module.fail_json(msg="drain_timeout is only usable with action=disable")
+
     rc = 0
     try:
         rc, result = core(module)
@@ -179,6 +443,12 @@ def main():
 
     if rc != 0:
         module.fail_json(rc=rc, msg=result)
+    elif result.get('drain', {}).get('unbound'):
+        result['changed'] = True
+        module.fail_json(msg="no bound services to watch connections of: %s" % ', '.join(result['drain']['unbound']), **result)
+    elif not result.get('drain', {'drained': True})['drained']:
+        result['changed'] = True
+        module.fail_json(msg="connections did not drain in time", **result)
     else:
         result['changed'] = True
         module.exit_json(**result)